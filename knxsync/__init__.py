@@ -5,62 +5,269 @@ For more details about this component, please refer to the documentation at
 https://github.com/envy/knxsync
 """
 
+import asyncio
 import logging
+import time
+from collections import defaultdict
+from collections.abc import Mapping
 from dataclasses import dataclass
+from typing import Any
 
+from .aggregate import Aggregate
+from .base import SyncedEntity
+from .batch import ServiceBatcher
 from .binary_sensor import SyncedBinarySensor
-from .const import DOMAIN, CONF_KNXSYNC_SYNCED_ENTITIES
+from .const import (
+    DOMAIN,
+    CONF_KNXSYNC_SYNCED_ENTITIES,
+    CONF_KNXSYNC_AGGREGATES,
+    CONF_KNXSYNC_AGGREGATE_TYPE,
+    CONF_KNXSYNC_RESEND_MAX_AGE,
+    CONF_KNXSYNC_RATE_LIMIT,
+    CONF_KNXSYNC_RATE_BURST,
+    CONF_KNXSYNC_RATE_ADAPTIVE,
+    CONF_KNXSYNC_READ_COALESCE_WINDOW,
+    DEFAULT_RATE_LIMIT,
+    DEFAULT_RATE_BURST,
+    DEFAULT_READ_COALESCE_WINDOW,
+    CONF_KNXSYNC_INITIAL_SYNC,
+    CONF_KNXSYNC_SYNC_ORDER,
+    SYNC_ORDER_ADDRESS,
+    SYNC_ORDER_CONFIG,
+    SIGNAL_SYNC_PROGRESS,
+    EVENT_SYNC_COMPLETE,
+    CONF_KNXSYNC_TRACE,
+    TRACE_BUFFER_SIZE,
+    SERVICE_DUMP_TRACE,
+    ATTR_FILENAME,
+    SETUP_CONCURRENCY,
+    STORAGE_VERSION,
+)
 from .light import SyncedLight
 from .climate import SyncedClimate
-from .helpers import get_domain
+from .helpers import (
+    compile_group_addresses,
+    get_domain,
+    get_settings,
+    parse_ga,
+    ga_to_str,
+)
+from .trace import TraceRecorder
+from .transport import KNXTransport
+from .worker import TelegramHandler, TelegramWorker
+
+import voluptuous as vol
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.const import CONF_ADDRESS, CONF_ENTITIES
+from homeassistant.core import (
+    CALLBACK_TYPE,
+    Event,
+    HomeAssistant,
+    ServiceCall,
+    callback,
+)
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.event import (
+    EventStateChangedData,
+    async_track_state_change_event,
+)
 from homeassistant.components.binary_sensor import DOMAIN as DOMAIN_BINARY_SENSOR
 from homeassistant.components.light import DOMAIN as DOMAIN_LIGHT
 from homeassistant.components.climate import DOMAIN as DOMAIN_CLIMATE
+from homeassistant.components.knx.const import (
+    DOMAIN as DOMAIN_KNX,
+    KNX_ADDRESS,
+    SERVICE_KNX_ATTR_REMOVE,
+    SERVICE_KNX_EVENT_REGISTER,
+)
 
 VERSION = "0.1.0"
 
+DUMP_TRACE_SCHEMA = vol.Schema(
+    # Plain file names only, traces are written to the configuration directory
+    {vol.Optional(ATTR_FILENAME): vol.All(cv.string, vol.Match(r"^[\w.-]+$"))}
+)
+
 _LOGGER = logging.getLogger(DOMAIN)
 
 
 class KNXSyncer:
-    def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry):
+    synced_entities: dict[str, SyncedEntity]
+    # entity id -> aggregates it contributes to
+    aggregates: dict[str, list[Aggregate]]
+    routes: dict[tuple[int, str], list[tuple[TelegramWorker, TelegramHandler]]]
+    setup_duration: float
+    last_sync: dict[str, Any]
+    trace: TraceRecorder | None
+
+    def __init__(
+        self, hass: HomeAssistant, config_entry: ConfigEntry, persist: bool = True
+    ):
+        # Without persist, values known to the transport are not saved
         self.hass = hass
         self.config_entry = config_entry
         self.synced_entities = {}
+        self.aggregates = {}
+        self.routes = {}
+        self.setup_duration = 0.0
+        self.last_sync = {}
+        self._remove_state_listener: CALLBACK_TYPE | None = None
+        self._sync_task: asyncio.Task | None = None
 
         config = config_entry.data
         _LOGGER.debug(f"Current config: {config}")
-        for synced_entity_id, entity_config in config[
-            CONF_KNXSYNC_SYNCED_ENTITIES
-        ].items():
-            domain = get_domain(synced_entity_id)
-            if domain == DOMAIN_LIGHT:
-                self.synced_entities[synced_entity_id] = SyncedLight(
-                    hass, synced_entity_id, entity_config
-                )
-            elif domain == DOMAIN_CLIMATE:
-                self.synced_entities[synced_entity_id] = SyncedClimate(
-                    hass, synced_entity_id, entity_config
-                )
-            elif domain == DOMAIN_BINARY_SENSOR:
-                self.synced_entities[synced_entity_id] = SyncedBinarySensor(
-                    hass, synced_entity_id, entity_config
-                )
-            else:
-                _LOGGER.error(f"Unsupported domain '{domain}'")
+        self.transport = KNXTransport(
+            hass,
+            resend_max_age=config.get(CONF_KNXSYNC_RESEND_MAX_AGE) or 0,
+            rate=config.get(CONF_KNXSYNC_RATE_LIMIT, DEFAULT_RATE_LIMIT),
+            burst=config.get(CONF_KNXSYNC_RATE_BURST, DEFAULT_RATE_BURST),
+            adaptive=config.get(CONF_KNXSYNC_RATE_ADAPTIVE, True),
+            read_window=config.get(
+                CONF_KNXSYNC_READ_COALESCE_WINDOW, DEFAULT_READ_COALESCE_WINDOW
+            ),
+            store_key=_get_store_key(config_entry) if persist else None,
+        )
+        self.batcher = ServiceBatcher(hass)
+        # Snapshot of the configuration the current entities were built from
+        self._entity_configs = dict(config[CONF_KNXSYNC_SYNCED_ENTITIES])
+        self._settings = get_settings(config)
+        self._initial_sync = config.get(CONF_KNXSYNC_INITIAL_SYNC, False)
+        self._sync_order = config.get(CONF_KNXSYNC_SYNC_ORDER, SYNC_ORDER_CONFIG)
+        self.trace = (
+            TraceRecorder(hass, TRACE_BUFFER_SIZE)
+            if config.get(CONF_KNXSYNC_TRACE)
+            else None
+        )
+        for synced_entity_id, entity_config in self._entity_configs.items():
+            self._add_entity(synced_entity_id, entity_config)
+        self._build_aggregates(config.get(CONF_KNXSYNC_AGGREGATES) or {})
 
-    async def async_got_telegram(self, event: Event) -> None:
+        self._build_routes()
+
+    def _add_entity(self, synced_entity_id: str, entity_config: dict) -> None:
+        domain = get_domain(synced_entity_id)
+        if domain == DOMAIN_LIGHT:
+            self.synced_entities[synced_entity_id] = SyncedLight(
+                self.hass,
+                self.transport,
+                self.batcher,
+                synced_entity_id,
+                entity_config,
+            )
+        elif domain == DOMAIN_CLIMATE:
+            self.synced_entities[synced_entity_id] = SyncedClimate(
+                self.hass,
+                self.transport,
+                self.batcher,
+                synced_entity_id,
+                entity_config,
+            )
+        elif domain == DOMAIN_BINARY_SENSOR:
+            self.synced_entities[synced_entity_id] = SyncedBinarySensor(
+                self.hass,
+                self.transport,
+                self.batcher,
+                synced_entity_id,
+                entity_config,
+            )
+        else:
+            _LOGGER.error(f"Unsupported domain '{domain}'")
+
+    def _build_aggregates(self, aggregate_configs: Mapping[str, Any]) -> None:
+        aggregates = defaultdict(list)
+        for name, aggregate_config in aggregate_configs.items():
+            aggregate = Aggregate(
+                self.transport,
+                name,
+                aggregate_config[CONF_KNXSYNC_AGGREGATE_TYPE],
+                compile_group_addresses(aggregate_config.get(CONF_ADDRESS)),
+                aggregate_config.get(CONF_ENTITIES) or [],
+            )
+            for entity_id in aggregate.entity_ids:
+                aggregates[entity_id].append(aggregate)
+                # Fill in the current value without sending it
+                aggregate.update(entity_id, self.hass.states.get(entity_id), False)
+        self.aggregates = dict(aggregates)
+
+    def _build_routes(self) -> None:
+        # Map (destination, telegram type) to the handlers interested in it, so a
+        # telegram only costs a single lookup no matter how many entities are synced
+        routes = defaultdict(list)
         for syncer in self.synced_entities.values():
-            await syncer.async_got_telegram(event)
+            for address, telegramtype, handler in syncer.get_routes():
+                routes[(address, telegramtype)].append((syncer.worker, handler))
+        self.routes = dict(routes)
+        _LOGGER.debug(f"Built {len(self.routes)} telegram routes")
+
+    @callback
+    def _track_states(self) -> None:
+        # One tracker for all synced entities instead of one per entity
+        self._untrack_states()
+        self._remove_state_listener = async_track_state_change_event(
+            self.hass,
+            list(self.synced_entities.keys() | self.aggregates.keys()),
+            self._async_state_changed,
+        )
+
+    @callback
+    def _untrack_states(self) -> None:
+        if self._remove_state_listener is not None:
+            self._remove_state_listener()
+            self._remove_state_listener = None
+
+    async def _async_state_changed(self, event: Event[EventStateChangedData]) -> None:
+        entity_id = event.data["entity_id"]
+        if self.trace is not None:
+            self.trace.record_state(entity_id, event.data["new_state"])
+        syncer = self.synced_entities.get(entity_id)
+        if syncer is not None:
+            await syncer.async_state_changed(event)
+        for aggregate in self.aggregates.get(entity_id, ()):
+            aggregate.update(entity_id, event.data["new_state"])
+
+    @callback
+    def _filter_telegram(self, event_data: Mapping[str, Any]) -> bool:
+        # Runs inside the event bus, telegrams we have no route for never get
+        # a coroutine scheduled
+        return (
+            parse_ga(event_data["destination"]),
+            event_data["telegramtype"],
+        ) in self.routes
+
+    @callback
+    def async_got_telegram(self, event: Event) -> None:
+        # Only hand the telegram to the workers of the matching entities, they
+        # process it concurrently to each other but in order per entity
+        data = event.data
+        if self.trace is not None:
+            self.trace.record_telegram(data)
+        address = data["destination"]
+        payload = data.get("data")
+        route = (parse_ga(address), data["telegramtype"])
+        for worker, handler in self.routes.get(route, ()):
+            worker.put(handler, address, payload)
 
     async def async_setup_events(self, config_entry: ConfigEntry) -> None:
         _LOGGER.debug("Setting up event listeners")
+        started = time.monotonic()
 
-        for syncer in self.synced_entities.values():
-            await syncer.async_setup_events()
+        self.transport.start(config_entry)
+
+        # Every address we route is registered once, no matter how many
+        # entities listen to it
+        addresses = self._get_routed_addresses()
+        await self._async_register_addresses(addresses)
+        await self._async_setup_entities(list(self.synced_entities.values()))
+        self._track_states()
+
+        self.setup_duration = time.monotonic() - started
+        _LOGGER.debug(
+            f"Registered {len(addresses)} group addresses for "
+            f"{len(self.synced_entities)} entities in {self.setup_duration:.3f}s"
+        )
 
         # async_listen returns a callback for unregistering the listener
         # We register that callback here to get called when we are unloaded
@@ -68,15 +275,167 @@ class KNXSyncer:
             config_entry.add_update_listener(async_update_entry)
         )
         config_entry.async_on_unload(
-            self.hass.bus.async_listen("knx_event", self.async_got_telegram)
+            self.hass.bus.async_listen(
+                "knx_event",
+                self.async_got_telegram,
+                event_filter=self._filter_telegram,
+            )
         )
         config_entry.async_on_unload(self.shutdown)
 
+        if self.trace is not None:
+            self.hass.services.async_register(
+                DOMAIN, SERVICE_DUMP_TRACE, self._async_dump_trace, DUMP_TRACE_SCHEMA
+            )
+            config_entry.async_on_unload(
+                lambda: self.hass.services.async_remove(DOMAIN, SERVICE_DUMP_TRACE)
+            )
+
+        if self._initial_sync:
+            config_entry.async_on_unload(
+                self.transport.async_add_reconnect_listener(
+                    lambda: self._start_sync("reconnect")
+                )
+            )
+            self._start_sync("startup")
+
+    async def _async_dump_trace(self, call: ServiceCall) -> None:
+        filename = call.data.get(ATTR_FILENAME) or time.strftime(
+            f"{DOMAIN}_trace_%Y%m%d_%H%M%S.jsonl"
+        )
+        await self.trace.async_dump(self.hass.config.path(filename))
+
+    def _get_sync_addresses(self) -> list[int]:
+        addresses = dict.fromkeys(
+            address
+            for syncer in self.synced_entities.values()
+            for address in syncer.get_state_addresses()
+        )
+        for aggregates in self.aggregates.values():
+            for aggregate in aggregates:
+                addresses.update(dict.fromkeys(sorted(aggregate.addresses)))
+        if self._sync_order == SYNC_ORDER_ADDRESS:
+            return sorted(addresses)
+        return list(addresses)
+
+    @callback
+    def _start_sync(self, reason: str) -> None:
+        # A new sync replaces one still running, it sends the same addresses
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+        self._sync_task = self.config_entry.async_create_background_task(
+            self.hass, self._async_sync(reason), f"{DOMAIN} sync"
+        )
+
+    async def _async_sync(self, reason: str) -> None:
+        addresses = self._get_sync_addresses()
+        started = time.monotonic()
+        self.last_sync = {"reason": reason, "total": len(addresses), "done": 0}
+        _LOGGER.info(f"Syncing {len(addresses)} group addresses to KNX on {reason}")
+
+        @callback
+        def progress(done: int) -> None:
+            self.last_sync["done"] = done
+            async_dispatcher_send(
+                self.hass, SIGNAL_SYNC_PROGRESS, done, len(addresses)
+            )
+
+        sent = await self.transport.async_send_bulk(addresses, progress)
+        self.last_sync["sent"] = sent
+        self.last_sync["duration"] = time.monotonic() - started
+        _LOGGER.info(
+            f"Synced {sent} values to KNX in {self.last_sync['duration']:.1f}s"
+        )
+        self.hass.bus.async_fire(EVENT_SYNC_COMPLETE, dict(self.last_sync))
+
+    def _get_routed_addresses(self) -> set[int]:
+        return {address for address, _ in self.routes}
+
+    async def _async_register_addresses(
+        self, addresses: set[int], remove: bool = False
+    ) -> None:
+        if not addresses:
+            return
+        data = {KNX_ADDRESS: [ga_to_str(address) for address in sorted(addresses)]}
+        if remove:
+            data[SERVICE_KNX_ATTR_REMOVE] = True
+        await self.hass.services.async_call(
+            DOMAIN_KNX, SERVICE_KNX_EVENT_REGISTER, data
+        )
+
+    async def _async_setup_entities(self, synced_entities: list[SyncedEntity]) -> None:
+        semaphore = asyncio.Semaphore(SETUP_CONCURRENCY)
+
+        async def async_setup_entity(syncer: SyncedEntity) -> None:
+            async with semaphore:
+                await syncer.async_setup_events()
+            syncer.worker.start(self.config_entry)
+
+        await asyncio.gather(
+            *(async_setup_entity(syncer) for syncer in synced_entities)
+        )
+
+    async def async_update_config(self, config_entry: ConfigEntry) -> bool:
+        """Apply a changed configuration to the running entities.
+
+        Only entities that were added, removed or changed are rebuilt, everything
+        else keeps running. Returns False if the change needs a full reload.
+        """
+        config = config_entry.data
+        if get_settings(config) != self._settings:
+            return False
+
+        new_configs = config[CONF_KNXSYNC_SYNCED_ENTITIES]
+        removed = self._entity_configs.keys() - new_configs.keys()
+        added = new_configs.keys() - self._entity_configs.keys()
+        modified = {
+            synced_entity_id
+            for synced_entity_id in self._entity_configs.keys() & new_configs.keys()
+            if self._entity_configs[synced_entity_id] != new_configs[synced_entity_id]
+        }
+        if not (removed or added or modified):
+            return True
+        _LOGGER.debug(
+            f"Updating config: added {added}, removed {removed}, modified {modified}"
+        )
+
+        old_addresses = self._get_routed_addresses()
+        await asyncio.gather(
+            *(
+                self.synced_entities.pop(synced_entity_id).async_shutdown()
+                for synced_entity_id in removed | modified
+                if synced_entity_id in self.synced_entities
+            )
+        )
+        for synced_entity_id in added | modified:
+            self._add_entity(synced_entity_id, new_configs[synced_entity_id])
+        self._entity_configs = dict(new_configs)
+        self._build_routes()
+        if added or removed:
+            self._track_states()
+
+        new_addresses = self._get_routed_addresses()
+        await self._async_register_addresses(new_addresses - old_addresses)
+        await self._async_register_addresses(old_addresses - new_addresses, remove=True)
+        await self._async_setup_entities(
+            [
+                self.synced_entities[synced_entity_id]
+                for synced_entity_id in added | modified
+                if synced_entity_id in self.synced_entities
+            ]
+        )
+        return True
+
     @callback
     def shutdown(self) -> None:
         _LOGGER.debug("Shutting down...")
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            self._sync_task = None
+        self._untrack_states()
         for syncer in self.synced_entities.values():
             syncer.shutdown(self.config_entry)
+        self.transport.stop()
 
 
 @dataclass
@@ -91,6 +450,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: KnxSyncConfigEntry) -> b
 
     entry.runtime_data = KnxSyncData(KNXSyncer(hass, entry))
 
+    # Last known values answer reads until the synced entities report state
+    await entry.runtime_data.syncer.transport.async_load()
     await entry.runtime_data.syncer.async_setup_events(entry)
     return True
 
@@ -99,5 +460,14 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     return True
 
 
-async def async_update_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    await hass.config_entries.async_reload(entry.entry_id)
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    await Store(hass, STORAGE_VERSION, _get_store_key(entry)).async_remove()
+
+
+def _get_store_key(config_entry: ConfigEntry) -> str:
+    return f"{DOMAIN}.{config_entry.entry_id}"
+
+
+async def async_update_entry(hass: HomeAssistant, entry: KnxSyncConfigEntry) -> None:
+    if not await entry.runtime_data.syncer.async_update_config(entry):
+        await hass.config_entries.async_reload(entry.entry_id)
@@ -0,0 +1,111 @@
+import logging
+from collections.abc import Iterable
+
+from .const import (
+    DOMAIN,
+    AGGREGATE_ANY_ON,
+    AGGREGATE_COUNT_ON,
+    AGGREGATE_AVERAGE_TEMPERATURE,
+)
+from .helpers import format_group_addresses
+from .transport import KNXTransport
+
+from homeassistant.const import STATE_ON
+from homeassistant.core import State
+from homeassistant.components.climate import ATTR_CURRENT_TEMPERATURE
+from xknx.dpt.dpt_9 import DPTTemperature
+from xknx.dpt.payload import DPTArray, DPTBinary
+
+_LOGGER = logging.getLogger(DOMAIN)
+
+
+class Aggregate:
+    """A value computed from the states of several entities and published to
+    group addresses.
+
+    any_on and count_on count the entities that are on, average_temperature
+    averages the current temperature of climate entities. Every entity adds
+    its contribution to a running count and sum, a state change only replaces
+    the contribution of its entity. The value is only sent when its encoded
+    payload changes.
+    """
+
+    __slots__ = (
+        "transport",
+        "name",
+        "kind",
+        "addresses",
+        "entity_ids",
+        "_contributions",
+        "_count",
+        "_total",
+        "_payload",
+    )
+
+    transport: KNXTransport
+    name: str
+    kind: str
+    addresses: frozenset[int]
+    entity_ids: tuple[str, ...]
+
+    def __init__(
+        self,
+        transport: KNXTransport,
+        name: str,
+        kind: str,
+        addresses: frozenset[int],
+        entity_ids: Iterable[str],
+    ) -> None:
+        self.transport = transport
+        self.name = name
+        self.kind = kind
+        self.addresses = addresses
+        self.entity_ids = tuple(entity_ids)
+        # entity id -> value it adds to the total, None if it does not count
+        self._contributions: dict[str, float | None] = {}
+        # Entities with a contribution and the sum of their contributions
+        self._count = 0
+        self._total = 0.0
+        self._payload: DPTBinary | DPTArray | None = None
+
+    def _get_contribution(self, state: State | None) -> float | None:
+        if state is None:
+            return None
+        if self.kind == AGGREGATE_AVERAGE_TEMPERATURE:
+            return state.attributes.get(ATTR_CURRENT_TEMPERATURE)
+        return 1 if state.state == STATE_ON else 0
+
+    def _encode(self) -> DPTBinary | DPTArray | None:
+        if self.kind == AGGREGATE_ANY_ON:
+            return DPTBinary(1 if self._total > 0 else 0)
+        if self.kind == AGGREGATE_COUNT_ON:
+            # DPT 5.010, counts beyond 255 are capped
+            return DPTArray((min(int(self._total), 255),))
+        if self._count == 0:
+            return None
+        return DPTTemperature.to_knx(round(self._total / self._count, 2))
+
+    def update(self, entity_id: str, state: State | None, send: bool = True) -> None:
+        old = self._contributions.get(entity_id)
+        new = self._get_contribution(state)
+        if old == new:
+            return
+        if old is not None:
+            self._count -= 1
+            self._total -= old
+        if new is not None:
+            self._count += 1
+            self._total += new
+        self._contributions[entity_id] = new
+
+        payload = self._encode()
+        if payload is None or payload == self._payload:
+            return
+        self._payload = payload
+        if not send:
+            self.transport.async_set_value(self.addresses, payload)
+            return
+        _LOGGER.debug(
+            f"Sending {self.kind} of {self.name} -> {format_group_addresses(self.addresses)}"
+        )
+        self.transport.async_send(self.addresses, payload)
@@ -1,44 +1,99 @@
 import logging
+from collections.abc import Awaitable, Iterator
 from typing import Any
 
-from .const import KNXSyncEntityBaseData, DOMAIN, CONF_KNXSYNC_BASE_ANSWER_READS
-from .helpers import parse_group_addresses
+from .const import (
+    KNXSyncEntityBaseData,
+    DOMAIN,
+    CONF_KNXSYNC_BASE_ANSWER_READS,
+    CONF_KNXSYNC_BASE_SUPPRESS_ECHO,
+    PRIORITY_BULK,
+    BREAKER_THRESHOLD,
+    BREAKER_COOLDOWN,
+)
+from .batch import MergedCallError, ServiceBatcher
+from .breaker import CircuitBreaker
+from .helpers import format_group_addresses, parse_ga
+from .transport import KNXTransport
+from .worker import TelegramHandler, TelegramWorker
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import Event, HomeAssistant
-from homeassistant.helpers.event import async_track_state_change_event
-from homeassistant.components.knx.const import (
-    DOMAIN as DOMAIN_KNX,
-    KNX_ADDRESS,
-    SERVICE_KNX_EVENT_REGISTER,
-)
+from homeassistant.core import Event, HomeAssistant, State, callback
+from xknx.dpt.payload import DPTArray, DPTBinary
 
 _LOGGER = logging.getLogger(DOMAIN)
 
 
 class SyncedEntity:
+    # Many entities are kept around, so instances only hold the fields below.
+    # Instead of the full HA state, subclasses keep the attributes they publish.
+    __slots__ = (
+        "hass",
+        "transport",
+        "batcher",
+        "synced_entity_id",
+        "worker",
+        "breaker",
+        "answer_reads",
+        "suppress_echo",
+        "_state_context_id",
+        "_echo_context_id",
+        "_echo",
+    )
+
     hass: HomeAssistant
     synced_entity_id: str
     answer_reads: bool
+    suppress_echo: bool
+    transport: KNXTransport
+    batcher: ServiceBatcher
+    worker: TelegramWorker
+    breaker: CircuitBreaker
 
     def __init__(
         self,
         hass: HomeAssistant,
+        transport: KNXTransport,
+        batcher: ServiceBatcher,
         synced_entity_id: str,
         entity_config: KNXSyncEntityBaseData,
     ) -> None:
         self.hass = hass
+        self.transport = transport
+        self.batcher = batcher
         self.synced_entity_id = synced_entity_id
-        self._config = entity_config
-        self.state = self.hass.states.get(self.synced_entity_id)
-        self._remove_listener = async_track_state_change_event(
-            self.hass, [self.synced_entity_id], self.async_state_changed
+        self.worker = TelegramWorker(hass, synced_entity_id)
+        self.breaker = CircuitBreaker(
+            synced_entity_id, BREAKER_THRESHOLD, BREAKER_COOLDOWN
         )
+        _LOGGER.debug(f"{self.synced_entity_id} <- {entity_config}")
 
-        self._set_value_from_config(CONF_KNXSYNC_BASE_ANSWER_READS, False)
+        self.answer_reads = entity_config.get(CONF_KNXSYNC_BASE_ANSWER_READS, False)
+        self.suppress_echo = entity_config.get(CONF_KNXSYNC_BASE_SUPPRESS_ECHO, True)
 
-    async def async_got_telegram(self, _: Event) -> None:
-        pass
+        # Values written from KNX by the last service call we made, keyed by the
+        # attribute they will show up in, and the context of that call
+        self._echo_context_id: str | None = None
+        self._echo: dict[str, Any] = {}
+        self._state_context_id: str | None = None
+        self._update_state(self.hass.states.get(self.synced_entity_id))
+
+    @property
+    def idle(self) -> bool:
+        # Whether no telegram of the entity is waiting or being handled
+        return self.worker.idle
+
+    def get_routes(self) -> Iterator[tuple[int, str, TelegramHandler]]:
+        # Yields (group address, telegram type, handler) for every handled telegram
+        return iter(())
+
+    def get_state_addresses(self) -> Iterator[int]:
+        # Yields the addresses a sync sends the current values of, in order
+        return iter(())
+
+    def _update_state(self, state: State | None) -> None:
+        # Copies what is needed from state, subclasses add their attributes
+        self._state_context_id = state.context.id if state is not None else None
 
     async def async_state_changed(self, _: Event) -> None:
         pass
@@ -46,29 +101,94 @@ class SyncedEntity:
     async def async_setup_events(self) -> None:
         pass
 
-    async def _async_remove_listener(self) -> None:
-        if self._remove_listener is not None:
-            _LOGGER.debug("Removing listener")
-            self._remove_listener()
-            self._remove_listener = None
-
-    def _set_value_from_config(self, config_key: str, default: Any) -> None:
-        setattr(self, config_key, self._config.get(config_key, default))
-        _LOGGER.debug(f"{self.synced_entity_id} <- {getattr(self, config_key)}")
+    async def _async_answer_read(self, address: str, _: Any) -> None:
+        _LOGGER.debug(f"Answering read for {self.synced_entity_id} <- {address}")
+        if not self.transport.async_answer_read(parse_ga(address)):
+            _LOGGER.debug(f"No value known yet for {address}")
 
-    async def _register_receiver(self, attr: str) -> None:
-        v = getattr(self, attr)
-
-        if type(v) is str:
-            # Old style config, convert to list
-            v = parse_group_addresses(v)
+    @callback
+    def _publish(
+        self,
+        name: str,
+        addresses: frozenset[int],
+        payload: DPTBinary | DPTArray,
+        send: bool = True,
+        echo_key: str | None = None,
+        value: Any = None,
+        force: bool = False,
+    ) -> bool:
+        # Makes payload the value of addresses and sends it unless send is unset.
+        # Echoes of values KNX wrote itself are never sent, returns False then.
+        # force sends payload even if it was the last value sent, behind all
+        # other telegrams as it only repeats what the bus already has (cyclic).
+        if not addresses:
+            return True
+        if echo_key is not None and self._is_echo(echo_key, value):
+            _LOGGER.debug(f"Not echoing {self.synced_entity_id} {name} to KNX")
+            # The bus has the value, a later change back to the old one is sent
+            self.transport.async_mark_sent(addresses, payload)
+            return False
+        if not send:
+            self.transport.async_set_value(addresses, payload)
+            return True
+        _LOGGER.debug(
+            f"Sending {self.synced_entity_id} {name} -> {format_group_addresses(addresses)}"
+        )
+        self.transport.async_send(
+            addresses, payload, priority=PRIORITY_BULK if force else None, force=force
+        )
+        return True
 
-        for address in v:
-            _LOGGER.debug(f"registering receiver {address} -> {self.synced_entity_id}")
-            await self.hass.services.async_call(
-                DOMAIN_KNX, SERVICE_KNX_EVENT_REGISTER, {KNX_ADDRESS: address}
+    async def _async_call_service(
+        self, domain: str, service: str, data: dict[str, Any], echo: dict[str, Any]
+    ) -> None:
+        # Calls service for the synced entity, echo holds the values the call will
+        # show up with in its state. Identical calls for other synced entities
+        # are merged into one. Calls for an entity that keeps failing are skipped.
+        if not self.breaker.allow():
+            _LOGGER.debug(f"Skipping {service} for failing {self.synced_entity_id}")
+            return
+        context, call = self.batcher.join(domain, service, self.synced_entity_id, data)
+        self._echo_context_id = context.id
+        self._echo = echo
+        try:
+            await self._async_track_call(call)
+        except MergedCallError as ex:
+            # Only a call for this entity alone tells whether it is the broken one
+            _LOGGER.debug(f"{ex}, calling it for {self.synced_entity_id} alone")
+            await self._async_track_call(
+                self.batcher.async_call_alone(
+                    domain, service, self.synced_entity_id, data, context
+                )
             )
 
+    async def _async_track_call(self, call: Awaitable[None]) -> None:
+        # Counts the outcome of call for the breaker
+        try:
+            await call
+        except MergedCallError:
+            raise
+        except TimeoutError:
+            self.breaker.failed(timeout=True)
+            raise
+        except Exception:
+            self.breaker.failed()
+            raise
+        self.breaker.succeeded()
+
+    def _is_echo(self, key: str, value: Any) -> bool:
+        # Whether value is just the state KNX wrote itself through our last call
+        return (
+            self.suppress_echo
+            and self._echo_context_id is not None
+            and self._state_context_id == self._echo_context_id
+            and key in self._echo
+            and self._echo[key] == value
+        )
+
     def shutdown(self, config_entry: ConfigEntry) -> None:
+        config_entry.async_create_task(self.hass, self.async_shutdown())
+
+    async def async_shutdown(self) -> None:
         _LOGGER.debug("Shutting down %s", self.synced_entity_id)
-        config_entry.async_create_task(self.hass, self._async_remove_listener())
+        self.worker.stop()
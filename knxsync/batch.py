@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from .const import DOMAIN, SERVICE_CALL_TIMEOUT
+
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import Context, HomeAssistant
+
+_LOGGER = logging.getLogger(DOMAIN)
+
+
+class MergedCallError(Exception):
+    """A call merged for several entities failed as a whole."""
+
+
+@dataclass(slots=True)
+class _Batch:
+    context: Context
+    entity_ids: list[str]
+    done: asyncio.Future
+
+
+class ServiceBatcher:
+    """Merges identical service calls for different synced entities.
+
+    A telegram to a group address shared by many synced entities reaches all
+    their workers at once. Calls with the same domain, service and data joined
+    within the same event loop iteration are made as one call with the list of
+    all entity ids, so integrations supporting groups switch them together.
+    All entities of a call share its context.
+
+    Calls block until the entities executed the service and fail with
+    TimeoutError after SERVICE_CALL_TIMEOUT seconds. A merged call that fails
+    raises MergedCallError for every entity, as it does not tell which entity
+    is the broken one.
+    """
+
+    hass: HomeAssistant
+    calls: int
+    merged: int
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self.calls = 0
+        self.merged = 0
+        self._pending: dict[tuple, _Batch] = {}
+
+    def join(
+        self, domain: str, service: str, entity_id: str, data: Mapping[str, Any]
+    ) -> tuple[Context, Awaitable[None]]:
+        # Returns the context of the call entity_id is part of and an awaitable
+        # finishing with the call
+        key = (domain, service, _freeze(data))
+        batch = self._pending.get(key)
+        if batch is not None:
+            batch.entity_ids.append(entity_id)
+            self.merged += 1
+            # One of the waiting workers being cancelled must not cancel the call
+            return batch.context, asyncio.shield(batch.done)
+        batch = _Batch(Context(), [entity_id], self.hass.loop.create_future())
+        self._pending[key] = batch
+        return batch.context, self._async_call(key, batch, domain, service, data)
+
+    async def _async_call(
+        self,
+        key: tuple,
+        batch: _Batch,
+        domain: str,
+        service: str,
+        data: Mapping[str, Any],
+    ) -> None:
+        try:
+            # Lets the other workers woken by the same telegram join first
+            await asyncio.sleep(0)
+            del self._pending[key]
+            entity_ids: str | list[str] = batch.entity_ids
+            if len(entity_ids) > 1:
+                _LOGGER.debug(f"Calling {service} for {len(entity_ids)} entities at once")
+            else:
+                entity_ids = entity_ids[0]
+            await self._async_call_service(
+                domain, service, entity_ids, data, batch.context
+            )
+        except asyncio.CancelledError:
+            self._pending.pop(key, None)
+            if len(batch.entity_ids) > 1:
+                batch.done.set_exception(
+                    MergedCallError(f"{service} call was cancelled")
+                )
+            raise
+        except Exception as ex:
+            if len(batch.entity_ids) == 1:
+                raise
+            error = MergedCallError(
+                f"{service} for {len(batch.entity_ids)} entities failed: {ex!r}"
+            )
+            batch.done.set_exception(error)
+            raise error from ex
+        batch.done.set_result(None)
+
+    async def async_call_alone(
+        self,
+        domain: str,
+        service: str,
+        entity_id: str,
+        data: Mapping[str, Any],
+        context: Context,
+    ) -> None:
+        # Calls service for entity_id without merging
+        await self._async_call_service(domain, service, entity_id, data, context)
+
+    async def _async_call_service(
+        self,
+        domain: str,
+        service: str,
+        entity_ids: str | list[str],
+        data: Mapping[str, Any],
+        context: Context,
+    ) -> None:
+        self.calls += 1
+        async with asyncio.timeout(SERVICE_CALL_TIMEOUT):
+            await self.hass.services.async_call(
+                domain,
+                service,
+                {ATTR_ENTITY_ID: entity_ids, **data},
+                blocking=True,
+                context=context,
+            )
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"calls": self.calls, "merged": self.merged}
+
+
+def _freeze(data: Mapping[str, Any]) -> tuple:
+    return tuple(
+        sorted(
+            (key, tuple(value) if isinstance(value, list) else value)
+            for key, value in data.items()
+        )
+    )
@@ -1,11 +1,14 @@
+import asyncio
 import logging
 
 from .const import (
     DOMAIN,
 )
 from .base import SyncedEntity
+from .helpers import compile_group_addresses, ga_to_str
+from .batch import ServiceBatcher
+from .transport import KNXTransport
 
-from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.const import CONF_ENTITY_ID
 from homeassistant.components.knx.const import (
@@ -22,38 +25,52 @@ _LOGGER = logging.getLogger(DOMAIN)
 
 
 class SyncedBinarySensor(SyncedEntity):
-    state_address: list[str]
+    __slots__ = ("state_address",)
+
+    state_address: frozenset[int]
 
     def __init__(
-        self, hass: HomeAssistant, synced_entity_id: str, entity_config: dict
+        self,
+        hass: HomeAssistant,
+        transport: KNXTransport,
+        batcher: ServiceBatcher,
+        synced_entity_id: str,
+        entity_config: dict,
     ) -> None:
-        super().__init__(hass, synced_entity_id, entity_config)
+        super().__init__(hass, transport, batcher, synced_entity_id, entity_config)
         _LOGGER.debug("Setting up synced binary sensor '%s'", self.synced_entity_id)
 
-        self._set_value_from_config(CONF_STATE_ADDRESS, list())
+        self.state_address = compile_group_addresses(
+            entity_config.get(CONF_STATE_ADDRESS)
+        )
 
     async def async_setup_events(self) -> None:
         # This directly configures knx native expose
-        for address in self.state_address:
-            await self.hass.services.async_call(
-                DOMAIN_KNX,
-                SERVICE_KNX_EXPOSURE_REGISTER,
-                {
-                    KNX_ADDRESS: address,
-                    SERVICE_KNX_ATTR_TYPE: ExposeSchema.CONF_KNX_EXPOSE_BINARY,
-                    CONF_ENTITY_ID: self.synced_entity_id,
-                },
+        await asyncio.gather(
+            *(
+                self.hass.services.async_call(
+                    DOMAIN_KNX,
+                    SERVICE_KNX_EXPOSURE_REGISTER,
+                    {
+                        KNX_ADDRESS: ga_to_str(address),
+                        SERVICE_KNX_ATTR_TYPE: ExposeSchema.CONF_KNX_EXPOSE_BINARY,
+                        CONF_ENTITY_ID: self.synced_entity_id,
+                    },
+                )
+                for address in self.state_address
             )
+        )
 
-    async def _async_shutdown(self) -> None:
+    async def async_shutdown(self) -> None:
+        await super().async_shutdown()
         _LOGGER.debug("Removing exposure for binary sensor '%s'", self.synced_entity_id)
-        for address in self.state_address:
-            await self.hass.services.async_call(
-                DOMAIN_KNX,
-                SERVICE_KNX_EXPOSURE_REGISTER,
-                {KNX_ADDRESS: address, SERVICE_KNX_ATTR_REMOVE: True},
+        await asyncio.gather(
+            *(
+                self.hass.services.async_call(
+                    DOMAIN_KNX,
+                    SERVICE_KNX_EXPOSURE_REGISTER,
+                    {KNX_ADDRESS: ga_to_str(address), SERVICE_KNX_ATTR_REMOVE: True},
+                )
+                for address in self.state_address
             )
-
-    def shutdown(self, config_entry: ConfigEntry) -> None:
-        super().shutdown(config_entry)
-        config_entry.async_create_task(self.hass, self._async_shutdown())
+        )
@@ -0,0 +1,93 @@
+import logging
+import time
+from typing import Any
+
+from .const import (
+    DOMAIN,
+    BREAKER_CLOSED,
+    BREAKER_OPEN,
+    BREAKER_HALF_OPEN,
+)
+
+_LOGGER = logging.getLogger(DOMAIN)
+
+
+class CircuitBreaker:
+    """Stops calling services for an entity that keeps failing.
+
+    After threshold failed or timed out calls in a row the breaker opens and
+    calls are skipped for cooldown seconds. The first call after that is let
+    through to probe the entity, success closes the breaker again and failure
+    opens it for another cooldown.
+    """
+
+    __slots__ = (
+        "name",
+        "threshold",
+        "cooldown",
+        "state",
+        "failures",
+        "timeouts",
+        "trips",
+        "skipped",
+        "_opened_at",
+    )
+
+    name: str
+    threshold: int
+    cooldown: float
+    state: str
+    failures: int
+    timeouts: int
+    trips: int
+    skipped: int
+
+    def __init__(self, name: str, threshold: int, cooldown: float) -> None:
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = BREAKER_CLOSED
+        # Failed calls in a row
+        self.failures = 0
+        self.timeouts = 0
+        self.trips = 0
+        self.skipped = 0
+        self._opened_at = 0.0
+
+    def allow(self) -> bool:
+        if self.state == BREAKER_OPEN:
+            if time.monotonic() - self._opened_at < self.cooldown:
+                self.skipped += 1
+                return False
+            self.state = BREAKER_HALF_OPEN
+        return True
+
+    def succeeded(self) -> None:
+        self.failures = 0
+        if self.state != BREAKER_CLOSED:
+            _LOGGER.info(f"Calls for {self.name} succeed again")
+            self.state = BREAKER_CLOSED
+
+    def failed(self, timeout: bool = False) -> None:
+        self.failures += 1
+        if timeout:
+            self.timeouts += 1
+        if self.state == BREAKER_HALF_OPEN or (
+            self.state == BREAKER_CLOSED and self.failures >= self.threshold
+        ):
+            self.state = BREAKER_OPEN
+            self._opened_at = time.monotonic()
+            self.trips += 1
+            _LOGGER.warning(
+                f"{self.failures} calls for {self.name} failed in a row, "
+                f"skipping its calls for {self.cooldown}s"
+            )
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "trips": self.trips,
+            "skipped": self.skipped,
+        }
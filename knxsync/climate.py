@@ -1,17 +1,26 @@
 import logging
 
-from typing import Final
+from collections.abc import Iterator
+from functools import partial
+from typing import Any, Final
 
 from .const import (
     KNXSyncEntityClimateData,
     DOMAIN,
     TELEGRAMTYPE_READ,
     TELEGRAMTYPE_WRITE,
+    CONF_KNXSYNC_CLIMATE_SEND_DELTA,
+    CONF_KNXSYNC_CLIMATE_SEND_DELTA_RELATIVE,
+    CONF_KNXSYNC_CLIMATE_SEND_MIN_INTERVAL,
+    CONF_KNXSYNC_CLIMATE_SEND_CYCLE,
 )
-from .base import SyncedEntity
+from .base import SyncedEntity, TelegramHandler
+from .helpers import compile_group_addresses
+from .throttle import SendOnDelta
+from .batch import ServiceBatcher
+from .transport import KNXTransport
 
-from homeassistant.core import Event, HomeAssistant
-from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import Event, HomeAssistant, State, callback
 from homeassistant.components.climate import (
     DOMAIN as DOMAIN_CLIMATE,
     ATTR_CURRENT_TEMPERATURE,
@@ -23,15 +32,7 @@ from homeassistant.components.climate import (
     HVACMode,
 )
 from homeassistant.components.knx.schema import ClimateSchema
-from homeassistant.components.knx.const import (
-    DOMAIN as DOMAIN_KNX,
-    SERVICE_KNX_SEND,
-    SERVICE_KNX_ATTR_PAYLOAD,
-    SERVICE_KNX_ATTR_RESPONSE,
-    SERVICE_KNX_ATTR_TYPE,
-    KNX_ADDRESS,
-)
-from xknx.dpt.dpt_9 import DPT2ByteFloat
+from xknx.dpt.dpt_9 import DPT2ByteFloat, DPTTemperature
 from xknx.dpt.dpt_20 import DPTHVACContrMode, HVACControllerMode
 from xknx.dpt.payload import DPTArray
 
@@ -61,190 +62,221 @@ def xknx_to_ha_controller_mode(knx: HVACControllerMode) -> HVACMode:
 
 
 class SyncedClimate(SyncedEntity):
-    temperature_address: list[str]
-    target_temperature_address: list[str]
-    target_temperature_state_address: list[str]
-    operation_mode_address: list[str]
-    operation_mode_state_address: list[str]
-    controller_mode_address: list[str]
-    controller_mode_state_address: list[str]
+    __slots__ = (
+        "temperature_address",
+        "target_temperature_address",
+        "target_temperature_state_address",
+        "operation_mode_address",
+        "operation_mode_state_address",
+        "controller_mode_address",
+        "controller_mode_state_address",
+        "current_temperature",
+        "target_temperature",
+        "hvac_mode",
+        "hvac_modes",
+        "_current_temperature_delta",
+        "_setpoint_delta",
+    )
+
+    temperature_address: frozenset[int]
+    target_temperature_address: frozenset[int]
+    target_temperature_state_address: frozenset[int]
+    operation_mode_address: frozenset[int]
+    operation_mode_state_address: frozenset[int]
+    controller_mode_address: frozenset[int]
+    controller_mode_state_address: frozenset[int]
+    # Published state, all None without a state
+    current_temperature: float | None
+    target_temperature: float | None
+    hvac_mode: str | None
+    hvac_modes: tuple[str, ...] | None
 
     def __init__(
         self,
         hass: HomeAssistant,
+        transport: KNXTransport,
+        batcher: ServiceBatcher,
         synced_entity_id: str,
         entity_config: KNXSyncEntityClimateData,
     ):
-        super().__init__(hass, synced_entity_id, entity_config)
+        super().__init__(hass, transport, batcher, synced_entity_id, entity_config)
 
         _LOGGER.debug(f"Setting up synced climate '{self.synced_entity_id}'")
 
-        self._set_value_from_config(ClimateSchema.CONF_TEMPERATURE_ADDRESS, list())
-        self._set_value_from_config(
-            ClimateSchema.CONF_TARGET_TEMPERATURE_ADDRESS, list()
+        self.temperature_address = compile_group_addresses(
+            entity_config.get(ClimateSchema.CONF_TEMPERATURE_ADDRESS)
+        )
+        self.target_temperature_address = compile_group_addresses(
+            entity_config.get(ClimateSchema.CONF_TARGET_TEMPERATURE_ADDRESS)
         )
-        self._set_value_from_config(
-            ClimateSchema.CONF_TARGET_TEMPERATURE_STATE_ADDRESS, list()
+        self.target_temperature_state_address = compile_group_addresses(
+            entity_config.get(ClimateSchema.CONF_TARGET_TEMPERATURE_STATE_ADDRESS)
         )
-        self._set_value_from_config(ClimateSchema.CONF_OPERATION_MODE_ADDRESS, list())
-        self._set_value_from_config(
-            ClimateSchema.CONF_OPERATION_MODE_STATE_ADDRESS, list()
+        self.operation_mode_address = compile_group_addresses(
+            entity_config.get(ClimateSchema.CONF_OPERATION_MODE_ADDRESS)
         )
-        self._set_value_from_config(ClimateSchema.CONF_CONTROLLER_MODE_ADDRESS, list())
-        self._set_value_from_config(
-            ClimateSchema.CONF_CONTROLLER_MODE_STATE_ADDRESS, list()
+        self.operation_mode_state_address = compile_group_addresses(
+            entity_config.get(ClimateSchema.CONF_OPERATION_MODE_STATE_ADDRESS)
+        )
+        self.controller_mode_address = compile_group_addresses(
+            entity_config.get(ClimateSchema.CONF_CONTROLLER_MODE_ADDRESS)
+        )
+        self.controller_mode_state_address = compile_group_addresses(
+            entity_config.get(ClimateSchema.CONF_CONTROLLER_MODE_STATE_ADDRESS)
         )
 
-    async def async_got_telegram(self, event: Event) -> None:
-        data = event.data
-        address = data["destination"]
-        type = data["telegramtype"]
-
-        if type == TELEGRAMTYPE_WRITE:
-            payload = data["data"]
-            if address in self.target_temperature_address:
-                value = DPT2ByteFloat.from_knx(DPTArray(payload))
-                _LOGGER.debug(
-                    f"Setting setpoint of {self.synced_entity_id} <- {address}"
-                )
-                await self.hass.services.async_call(
+        # Temperatures are only sent on relevant changes, like a KNX sensor would
+        delta_config = dict(
+            delta=entity_config.get(CONF_KNXSYNC_CLIMATE_SEND_DELTA, 0),
+            relative=entity_config.get(CONF_KNXSYNC_CLIMATE_SEND_DELTA_RELATIVE, False),
+            min_interval=entity_config.get(CONF_KNXSYNC_CLIMATE_SEND_MIN_INTERVAL, 0),
+            cycle=entity_config.get(CONF_KNXSYNC_CLIMATE_SEND_CYCLE, 0),
+        )
+        self._current_temperature_delta = SendOnDelta(
+            hass, partial(self._send_current_temperature, True), **delta_config
+        )
+        self._setpoint_delta = SendOnDelta(
+            hass, partial(self._send_setpoint_temperature, True), **delta_config
+        )
+
+        # Fill in the values for reads without sending them
+        self._publish_state(send=False)
+
+    def _update_state(self, state: State | None) -> None:
+        super()._update_state(state)
+        if state is None:
+            self.current_temperature = self.target_temperature = None
+            self.hvac_mode = None
+            self.hvac_modes = None
+            return
+        self.current_temperature = state.attributes.get(ATTR_CURRENT_TEMPERATURE)
+        self.target_temperature = state.attributes.get(ATTR_TEMPERATURE)
+        self.hvac_mode = state.state
+        hvac_modes = state.attributes.get(ATTR_HVAC_MODES)
+        self.hvac_modes = tuple(hvac_modes) if hvac_modes is not None else ()
+
+    def get_routes(self) -> Iterator[tuple[int, str, TelegramHandler]]:
+        for address in self.target_temperature_address:
+            yield address, TELEGRAMTYPE_WRITE, self._async_got_setpoint_temperature
+        for address in self.controller_mode_address:
+            yield address, TELEGRAMTYPE_WRITE, self._async_got_controller_mode
+
+        if not self.answer_reads:
+            return
+
+        for address in (
+            self.temperature_address
+            | self.target_temperature_state_address
+            | self.controller_mode_state_address
+        ):
+            yield address, TELEGRAMTYPE_READ, self._async_answer_read
+
+    def get_state_addresses(self) -> Iterator[int]:
+        yield from sorted(self.temperature_address)
+        yield from sorted(self.target_temperature_state_address)
+        yield from sorted(self.controller_mode_state_address)
+
+    async def _async_got_setpoint_temperature(self, address: str, payload: Any) -> None:
+        value = DPT2ByteFloat.from_knx(DPTArray(payload))
+        _LOGGER.debug(f"Setting setpoint of {self.synced_entity_id} <- {address}")
+        await self._async_call_service(
+            DOMAIN_CLIMATE,
+            SERVICE_SET_TEMPERATURE,
+            {ATTR_TEMPERATURE: value},
+            {ATTR_TEMPERATURE: value},
+        )
+
+    async def _async_got_controller_mode(self, address: str, payload: Any) -> None:
+        value = xknx_to_ha_controller_mode(DPTHVACContrMode.from_knx(DPTArray(payload)))
+        _LOGGER.debug(
+            f"Setting operation mode of {self.synced_entity_id} <- {address}"
+        )
+        if self.hvac_modes is not None:
+            if value in self.hvac_modes:
+                await self._async_call_service(
                     DOMAIN_CLIMATE,
-                    SERVICE_SET_TEMPERATURE,
-                    {ATTR_ENTITY_ID: self.synced_entity_id, ATTR_TEMPERATURE: value},
-                )
-            if address in self.controller_mode_address:
-                value = xknx_to_ha_controller_mode(
-                    DPTHVACContrMode.from_knx(DPTArray(payload))
+                    SERVICE_SET_HVAC_MODE,
+                    {ATTR_HVAC_MODE: value},
+                    {ATTR_HVAC_MODE: value},
                 )
-                _LOGGER.debug(
-                    f"Setting operation mode of {self.synced_entity_id} <- {address}"
+            else:
+                _LOGGER.error(
+                    f"Could not set controller mode of {self.synced_entity_id}: Requested mode '{value}' is not in reported available modes '{list(self.hvac_modes)}'"
                 )
-                if self.state != None:
-                    if value in self.state.attributes[ATTR_HVAC_MODES]:
-                        await self.hass.services.async_call(
-                            DOMAIN_CLIMATE,
-                            SERVICE_SET_HVAC_MODE,
-                            {
-                                ATTR_ENTITY_ID: self.synced_entity_id,
-                                ATTR_HVAC_MODE: value,
-                            },
-                        )
-                    else:
-                        _LOGGER.error(
-                            f"Could not set controller mode of {self.synced_entity_id}: Requested mode '{value}' is not in reported available modes '{self.state.attributes[ATTR_HVAC_MODES]}'"
-                        )
-                else:
-                    _LOGGER.error(
-                        f"Could not set controller mode of {self.synced_entity_id}: No state available to check if mode is suported."
-                    )
-        elif type == TELEGRAMTYPE_READ and self.answer_reads and self.state is not None:
-            _LOGGER.debug(f"Reading state for {self.synced_entity_id} <- {address}")
-            if address in self.temperature_address:
-                await self._send_current_temperature(True)
-            if address in self.target_temperature_state_address:
-                await self._send_setpoint_temperature(True)
-            if address in self.controller_mode_state_address:
-                await self._send_controller_mode(True)
+        else:
+            _LOGGER.error(
+                f"Could not set controller mode of {self.synced_entity_id}: No state available to check if mode is suported."
+            )
 
     async def async_state_changed(self, event: Event) -> None:
         data = event.data
 
         if "new_state" not in data.keys():
             return
-        self.state = data["new_state"]
+        self._update_state(data["new_state"])
 
-        _LOGGER.debug(f"new state: {self.state}")
+        _LOGGER.debug(f"new state: {data['new_state']}")
+        self._publish_state()
 
-        if (
-            self.temperature_address
-            and self.state.attributes[ATTR_CURRENT_TEMPERATURE] is not None
-        ):
-            await self._send_current_temperature()
+    def _publish_state(self, send: bool = True) -> None:
+        if self.temperature_address and self.current_temperature is not None:
+            self._send_current_temperature(
+                send and self._current_temperature_delta.check(self.current_temperature)
+            )
         if (
             self.target_temperature_state_address
-            and self.state.attributes[ATTR_TEMPERATURE] is not None
+            and self.target_temperature is not None
         ):
-            await self._send_setpoint_temperature()
+            self._send_setpoint_temperature(
+                send and self._setpoint_delta.check(self.target_temperature)
+            )
         if self.controller_mode_state_address:
-            await self._send_controller_mode()
+            self._send_controller_mode(send)
 
-    async def _send_current_temperature(self, response: bool = False) -> None:
-        if self.state == None:
+    @callback
+    def _send_current_temperature(self, send: bool = True, force: bool = False) -> None:
+        if self.current_temperature is None:
+            # Delayed sends may run after the state went away
             return
-        current_temperature = self.state.attributes[ATTR_CURRENT_TEMPERATURE]
-        _LOGGER.debug(
-            f"Sending {self.synced_entity_id} current temperature -> {self.temperature_address}"
+        self._publish(
+            "current temperature",
+            self.temperature_address,
+            DPTTemperature.to_knx(self.current_temperature),
+            send,
+            force=force,
         )
-        payload = current_temperature
-        for address in self.temperature_address:
-            await self.hass.services.async_call(
-                DOMAIN_KNX,
-                SERVICE_KNX_SEND,
-                {
-                    KNX_ADDRESS: address,
-                    SERVICE_KNX_ATTR_PAYLOAD: payload,
-                    SERVICE_KNX_ATTR_TYPE: "temperature",
-                    SERVICE_KNX_ATTR_RESPONSE: response,
-                },
-            )
 
-    async def _send_setpoint_temperature(self, response: bool = False) -> None:
-        if self.state == None:
-            return
-        setpoint_temperature = self.state.attributes[ATTR_TEMPERATURE]
-        if setpoint_temperature is None:
+    @callback
+    def _send_setpoint_temperature(
+        self, send: bool = True, force: bool = False
+    ) -> None:
+        if self.target_temperature is None:
             return
-        payload = setpoint_temperature
-        _LOGGER.debug(
-            f"Sending {self.synced_entity_id} setpoint temperarute -> {self.target_temperature_state_address}"
+        self._publish(
+            "setpoint temperature",
+            self.target_temperature_state_address,
+            DPTTemperature.to_knx(self.target_temperature),
+            send,
+            ATTR_TEMPERATURE,
+            self.target_temperature,
+            force,
         )
-        for address in self.target_temperature_state_address:
-            await self.hass.services.async_call(
-                DOMAIN_KNX,
-                SERVICE_KNX_SEND,
-                {
-                    KNX_ADDRESS: address,
-                    SERVICE_KNX_ATTR_PAYLOAD: payload,
-                    SERVICE_KNX_ATTR_TYPE: "temperature",
-                    SERVICE_KNX_ATTR_RESPONSE: response,
-                },
-            )
 
-    async def _send_controller_mode(self, response: bool = False) -> None:
-        if self.state == None:
-            return
-        op_mode = self.state.state
-        if op_mode is None:
+    @callback
+    def _send_controller_mode(self, send: bool = True) -> None:
+        if self.hvac_mode not in HA_HVAC_CONTROLLER_MODE_MAP:
+            # No state, unknown/unavailable or a mode KNX has no equivalent for
             return
-        payload = list(
-            DPTHVACContrMode.to_knx(ha_to_xknx_controller_mode(op_mode)).value
+        self._publish(
+            "controller mode",
+            self.controller_mode_state_address,
+            DPTHVACContrMode.to_knx(ha_to_xknx_controller_mode(self.hvac_mode)),
+            send,
+            ATTR_HVAC_MODE,
+            self.hvac_mode,
         )
-        _LOGGER.debug(
-            f"Sending {self.synced_entity_id} controller mode -> {self.controller_mode_state_address}"
-        )
-        for address in self.controller_mode_state_address:
-            await self.hass.services.async_call(
-                DOMAIN_KNX,
-                SERVICE_KNX_SEND,
-                {
-                    KNX_ADDRESS: address,
-                    SERVICE_KNX_ATTR_PAYLOAD: payload,
-                    SERVICE_KNX_ATTR_RESPONSE: response,
-                },
-            )
 
-    async def async_setup_events(self) -> None:
-        await self._register_receiver(ClimateSchema.CONF_TEMPERATURE_ADDRESS)
-        await self._register_receiver(ClimateSchema.CONF_TARGET_TEMPERATURE_ADDRESS)
-        await self._register_receiver(ClimateSchema.CONF_OPERATION_MODE_ADDRESS)
-        await self._register_receiver(ClimateSchema.CONF_CONTROLLER_MODE_ADDRESS)
-
-        if not self.answer_reads:
-            return
-
-        # Register for potential reads
-        await self._register_receiver(
-            ClimateSchema.CONF_TARGET_TEMPERATURE_STATE_ADDRESS
-        )
-        await self._register_receiver(ClimateSchema.CONF_OPERATION_MODE_STATE_ADDRESS)
-        await self._register_receiver(ClimateSchema.CONF_CONTROLLER_MODE_STATE_ADDRESS)
+    async def async_shutdown(self) -> None:
+        self._current_temperature_delta.cancel()
+        self._setpoint_delta.cancel()
+        await super().async_shutdown()
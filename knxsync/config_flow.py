@@ -4,7 +4,7 @@ from typing import Any
 
 from homeassistant import config_entries
 from homeassistant.core import callback
-from homeassistant.const import CONF_ENTITY_ID, CONF_ADDRESS
+from homeassistant.const import CONF_ENTITY_ID, CONF_ENTITIES, CONF_ADDRESS, CONF_NAME
 from homeassistant.components.binary_sensor import DOMAIN as DOMAIN_BINARY_SENSOR
 from homeassistant.components.light import DOMAIN as DOMAIN_LIGHT
 from homeassistant.components.climate import DOMAIN as DOMAIN_CLIMATE
@@ -17,14 +17,44 @@ from homeassistant.helpers import entity_registry, selector
 from .const import (
     DOMAIN,
     CONF_KNXSYNC_SYNCED_ENTITIES,
+    CONF_KNXSYNC_AGGREGATES,
+    CONF_KNXSYNC_AGGREGATE_TYPE,
+    AGGREGATE_TYPES,
+    CONF_KNXSYNC_RESEND_MAX_AGE,
+    CONF_KNXSYNC_RATE_LIMIT,
+    CONF_KNXSYNC_RATE_BURST,
+    CONF_KNXSYNC_RATE_ADAPTIVE,
+    CONF_KNXSYNC_READ_COALESCE_WINDOW,
+    CONF_KNXSYNC_INITIAL_SYNC,
+    CONF_KNXSYNC_SYNC_ORDER,
+    CONF_KNXSYNC_TRACE,
+    DEFAULT_RATE_LIMIT,
+    DEFAULT_RATE_BURST,
+    DEFAULT_READ_COALESCE_WINDOW,
+    SYNC_ORDER_CONFIG,
+    SYNC_ORDERS,
     CONF_KNXSYNC_BASE_ANSWER_READS,
+    CONF_KNXSYNC_BASE_SUPPRESS_ECHO,
     CONF_KNXSYNC_LIGHT_ZERO_BRIGHTNESS_WHEN_OFF,
+    CONF_KNXSYNC_LIGHT_BRIGHTNESS_COALESCE_WINDOW,
+    CONF_KNXSYNC_LIGHT_COLOR_COALESCE_WINDOW,
+    CONF_KNXSYNC_LIGHT_STATUS_THROTTLE,
+    CONF_KNXSYNC_CLIMATE_SEND_DELTA,
+    CONF_KNXSYNC_CLIMATE_SEND_DELTA_RELATIVE,
+    CONF_KNXSYNC_CLIMATE_SEND_MIN_INTERVAL,
+    CONF_KNXSYNC_CLIMATE_SEND_CYCLE,
+    KNXSyncAggregateData,
     KNXSyncEntryData,
     KNXSyncEntityBinarySensorData,
     KNXSyncEntityLightData,
     KNXSyncEntityClimateData,
 )
-from .helpers import get_domain, async_validate_light_config
+from .helpers import (
+    get_domain,
+    get_settings,
+    async_validate_aggregate_config,
+    async_validate_light_config,
+)
 
 import voluptuous as vol
 
@@ -69,17 +99,242 @@ class KNXSyncOptionsFlowHandler(config_entries.OptionsFlow):
     general_settings: dict
     is_new_entity: bool
     selected_entity_id: str | None
+    selected_aggregate: str | None
 
     def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
         self.config_entry = config_entry
         self.general_settings = {}
         self.is_new_entity = False
         self.selected_entity_id = None
+        self.selected_aggregate = None
 
     async def async_step_init(self, _: dict[str, Any] | None = None) -> FlowResult:
         self.current_config = self.config_entry.data
+        self.general_settings = get_settings(self.current_config)
         return self.async_show_menu(
-            step_id="init", menu_options=["new", "remove", "edit"]
+            step_id="init",
+            menu_options=["new", "remove", "edit", "aggregates", "settings"],
+        )
+
+    async def async_step_settings(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        if user_input is not None:
+            # Aggregates are kept with the settings but edited in their own step
+            self.general_settings = self.general_settings | user_input
+            entry_data = DEFAULT_ENTRY_DATA | self.general_settings
+            entry_data[CONF_KNXSYNC_SYNCED_ENTITIES] = deepcopy(
+                self.current_config[CONF_KNXSYNC_SYNCED_ENTITIES]
+            )
+            _LOGGER.debug(f"Saving new config: {entry_data}")
+            self.hass.config_entries.async_update_entry(
+                self.config_entry, data=entry_data, title="KNXSync"
+            )
+            return self.async_create_entry(title="", data={})
+
+        data = self.general_settings
+        return self.async_show_form(
+            step_id="settings",
+            last_step=True,
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_KNXSYNC_RESEND_MAX_AGE,
+                        description={
+                            "suggested_value": data.get(CONF_KNXSYNC_RESEND_MAX_AGE)
+                        },
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=0,
+                            max=86400,
+                            step=1,
+                            unit_of_measurement="s",
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_KNXSYNC_RATE_LIMIT,
+                        default=DEFAULT_RATE_LIMIT,
+                        description={
+                            "suggested_value": data.get(CONF_KNXSYNC_RATE_LIMIT)
+                        },
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=0,
+                            max=100,
+                            step=1,
+                            unit_of_measurement="telegrams/s",
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_KNXSYNC_RATE_BURST,
+                        default=DEFAULT_RATE_BURST,
+                        description={
+                            "suggested_value": data.get(CONF_KNXSYNC_RATE_BURST)
+                        },
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=1,
+                            max=100,
+                            step=1,
+                            unit_of_measurement="telegrams",
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_KNXSYNC_RATE_ADAPTIVE,
+                        default=True,
+                        description={
+                            "suggested_value": data.get(CONF_KNXSYNC_RATE_ADAPTIVE)
+                        },
+                    ): selector.BooleanSelector(),
+                    vol.Optional(
+                        CONF_KNXSYNC_READ_COALESCE_WINDOW,
+                        default=DEFAULT_READ_COALESCE_WINDOW,
+                        description={
+                            "suggested_value": data.get(
+                                CONF_KNXSYNC_READ_COALESCE_WINDOW
+                            )
+                        },
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=0,
+                            max=10000,
+                            step=10,
+                            unit_of_measurement="ms",
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_KNXSYNC_INITIAL_SYNC,
+                        default=False,
+                        description={
+                            "suggested_value": data.get(CONF_KNXSYNC_INITIAL_SYNC)
+                        },
+                    ): selector.BooleanSelector(),
+                    vol.Optional(
+                        CONF_KNXSYNC_SYNC_ORDER,
+                        default=SYNC_ORDER_CONFIG,
+                        description={
+                            "suggested_value": data.get(CONF_KNXSYNC_SYNC_ORDER)
+                        },
+                    ): selector.SelectSelector(
+                        selector.SelectSelectorConfig(
+                            options=SYNC_ORDERS,
+                            translation_key=CONF_KNXSYNC_SYNC_ORDER,
+                            mode=selector.SelectSelectorMode.DROPDOWN,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_KNXSYNC_TRACE,
+                        default=False,
+                        description={"suggested_value": data.get(CONF_KNXSYNC_TRACE)},
+                    ): selector.BooleanSelector(),
+                }
+            ),
+        )
+
+    async def async_step_aggregates(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        if user_input is not None:
+            self.selected_aggregate = user_input[CONF_NAME]
+            return await self.async_step_aggregate()
+
+        aggregates = list(self.general_settings.get(CONF_KNXSYNC_AGGREGATES) or {})
+        return self.async_show_form(
+            step_id="aggregates",
+            last_step=False,
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_NAME): selector.SelectSelector(
+                        selector.SelectSelectorConfig(
+                            options=aggregates,
+                            custom_value=True,
+                            mode=selector.SelectSelectorMode.DROPDOWN,
+                        )
+                    ),
+                }
+            ),
+        )
+
+    async def async_step_aggregate(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        errors = {}
+        aggregates = dict(self.general_settings.get(CONF_KNXSYNC_AGGREGATES) or {})
+        if user_input is not None:
+            errors = await async_validate_aggregate_config(user_input)
+            if not errors:
+                # Without entities the aggregate is removed
+                if user_input.get(CONF_ENTITIES):
+                    aggregates[self.selected_aggregate] = user_input
+                else:
+                    aggregates.pop(self.selected_aggregate, None)
+                self.general_settings = self.general_settings | {
+                    CONF_KNXSYNC_AGGREGATES: aggregates
+                }
+                entry_data = DEFAULT_ENTRY_DATA | self.general_settings
+                entry_data[CONF_KNXSYNC_SYNCED_ENTITIES] = deepcopy(
+                    self.current_config[CONF_KNXSYNC_SYNCED_ENTITIES]
+                )
+                _LOGGER.debug(f"Saving new config: {entry_data}")
+                self.hass.config_entries.async_update_entry(
+                    self.config_entry, data=entry_data, title="KNXSync"
+                )
+                return self.async_create_entry(title="", data={})
+
+        data = aggregates.get(self.selected_aggregate) or KNXSyncAggregateData()
+        _LOGGER.debug(f"Config for aggregate {self.selected_aggregate}: {data}")
+
+        project: KNXProject = self.hass.data[DOMAIN_KNX].project
+        gas = [
+            selector.SelectOptionDict(
+                value=ga.address, label=f"{ga.address} - {ga.name}"
+            )
+            for ga in project.group_addresses.values()
+            if ga.dpt_main in (1, 5, 9)
+        ]
+
+        return self.async_show_form(
+            step_id="aggregate",
+            last_step=True,
+            errors=errors,
+            description_placeholders={"name": self.selected_aggregate},
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_KNXSYNC_AGGREGATE_TYPE,
+                        description={
+                            "suggested_value": data.get(CONF_KNXSYNC_AGGREGATE_TYPE)
+                        },
+                    ): selector.SelectSelector(
+                        selector.SelectSelectorConfig(
+                            options=AGGREGATE_TYPES,
+                            translation_key="aggregate_type",
+                            mode=selector.SelectSelectorMode.DROPDOWN,
+                        )
+                    ),
+                    vol.Required(
+                        CONF_ADDRESS,
+                        description={"suggested_value": data.get(CONF_ADDRESS)},
+                    ): selector.SelectSelector(
+                        selector.SelectSelectorConfig(
+                            mode=selector.SelectSelectorMode.DROPDOWN,
+                            multiple=True,
+                            custom_value=True,
+                            options=gas,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_ENTITIES,
+                        description={"suggested_value": data.get(CONF_ENTITIES)},
+                    ): selector.EntitySelector(
+                        selector.EntitySelectorConfig(multiple=True)
+                    ),
+                }
+            ),
         )
 
     async def async_step_new(
@@ -255,6 +510,13 @@ class KNXSyncOptionsFlowHandler(config_entries.OptionsFlow):
                             "suggested_value": data.get(CONF_KNXSYNC_BASE_ANSWER_READS)
                         },
                     ): selector.BooleanSelector(),
+                    vol.Optional(
+                        CONF_KNXSYNC_BASE_SUPPRESS_ECHO,
+                        default=True,
+                        description={
+                            "suggested_value": data.get(CONF_KNXSYNC_BASE_SUPPRESS_ECHO)
+                        },
+                    ): selector.BooleanSelector(),
                     vol.Optional(
                         CONF_ADDRESS,
                         description={"suggested_value": data.get(CONF_ADDRESS)},
@@ -343,6 +605,54 @@ class KNXSyncOptionsFlowHandler(config_entries.OptionsFlow):
                             options=dpt232_600_gas,
                         )
                     ),
+                    vol.Optional(
+                        CONF_KNXSYNC_LIGHT_BRIGHTNESS_COALESCE_WINDOW,
+                        description={
+                            "suggested_value": data.get(
+                                CONF_KNXSYNC_LIGHT_BRIGHTNESS_COALESCE_WINDOW
+                            )
+                        },
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=0,
+                            max=5000,
+                            step=10,
+                            unit_of_measurement="ms",
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_KNXSYNC_LIGHT_COLOR_COALESCE_WINDOW,
+                        description={
+                            "suggested_value": data.get(
+                                CONF_KNXSYNC_LIGHT_COLOR_COALESCE_WINDOW
+                            )
+                        },
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=0,
+                            max=5000,
+                            step=10,
+                            unit_of_measurement="ms",
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_KNXSYNC_LIGHT_STATUS_THROTTLE,
+                        description={
+                            "suggested_value": data.get(
+                                CONF_KNXSYNC_LIGHT_STATUS_THROTTLE
+                            )
+                        },
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=0,
+                            max=10000,
+                            step=50,
+                            unit_of_measurement="ms",
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
                 }
             ),
         )
@@ -398,6 +708,13 @@ class KNXSyncOptionsFlowHandler(config_entries.OptionsFlow):
                             "suggested_value": data.get(CONF_KNXSYNC_BASE_ANSWER_READS)
                         },
                     ): selector.BooleanSelector(),
+                    vol.Optional(
+                        CONF_KNXSYNC_BASE_SUPPRESS_ECHO,
+                        default=True,
+                        description={
+                            "suggested_value": data.get(CONF_KNXSYNC_BASE_SUPPRESS_ECHO)
+                        },
+                    ): selector.BooleanSelector(),
                     vol.Optional(
                         ClimateSchema.CONF_TEMPERATURE_ADDRESS,
                         description={
@@ -503,6 +820,61 @@ class KNXSyncOptionsFlowHandler(config_entries.OptionsFlow):
                             options=dpt20_gas,
                         )
                     ),
+                    vol.Optional(
+                        CONF_KNXSYNC_CLIMATE_SEND_DELTA,
+                        default=0,
+                        description={
+                            "suggested_value": data.get(CONF_KNXSYNC_CLIMATE_SEND_DELTA)
+                        },
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=0,
+                            max=100,
+                            step=0.1,
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_KNXSYNC_CLIMATE_SEND_DELTA_RELATIVE,
+                        default=False,
+                        description={
+                            "suggested_value": data.get(
+                                CONF_KNXSYNC_CLIMATE_SEND_DELTA_RELATIVE
+                            )
+                        },
+                    ): selector.BooleanSelector(),
+                    vol.Optional(
+                        CONF_KNXSYNC_CLIMATE_SEND_MIN_INTERVAL,
+                        default=0,
+                        description={
+                            "suggested_value": data.get(
+                                CONF_KNXSYNC_CLIMATE_SEND_MIN_INTERVAL
+                            )
+                        },
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=0,
+                            max=3600,
+                            step=1,
+                            unit_of_measurement="s",
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_KNXSYNC_CLIMATE_SEND_CYCLE,
+                        default=0,
+                        description={
+                            "suggested_value": data.get(CONF_KNXSYNC_CLIMATE_SEND_CYCLE)
+                        },
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=0,
+                            max=86400,
+                            step=1,
+                            unit_of_measurement="s",
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
                 }
             ),
         )
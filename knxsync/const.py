@@ -6,15 +6,115 @@ DOMAIN = "knxsync"
 TELEGRAMTYPE_WRITE: Final = "GroupValueWrite"
 TELEGRAMTYPE_READ: Final = "GroupValueRead"
 
+# Distinct group address strings and address lists kept parsed
+GROUP_ADDRESS_CACHE_SIZE: Final = 4096
+
+# Synced entities set up at the same time
+SETUP_CONCURRENCY: Final = 16
+
+# Outbound priority classes, lower is sent first
+PRIORITY_RESPONSE: Final = 0
+PRIORITY_STATE: Final = 1
+PRIORITY_BULK: Final = 2
+
+DEFAULT_RATE_LIMIT: Final = 20
+DEFAULT_RATE_BURST: Final = 10
+# Milliseconds a read response also answers further reads of its address
+DEFAULT_READ_COALESCE_WINDOW: Final = 200
+
+# Adaptive send rate: telegrams/s gained per sent telegram, factor applied on
+# congestion, lower bound in telegrams/s and seconds between two reductions
+AIMD_INCREASE: Final = 0.5
+AIMD_DECREASE: Final = 0.5
+AIMD_MIN_RATE: Final = 1
+AIMD_BACKOFF_HOLD: Final = 1
+# Seconds after which a sent telegram counts as congested or as lost
+CONGESTION_LATENCY: Final = 0.5
+CONGESTION_TIMEOUT: Final = 5
+# Weight of the newest sample in the transport latency averages
+TRANSPORT_LATENCY_SMOOTHING: Final = 0.2
+# Seconds between checks for a new xknx instance while telegrams are held
+CONNECTION_CHECK_INTERVAL: Final = 5
+
+# Initial sync of all state addresses: values queued at a time, signal sent with
+# (addresses done, addresses total) while it runs and event fired when it is done
+SYNC_CHUNK_SIZE: Final = 10
+SIGNAL_SYNC_PROGRESS: Final = f"{DOMAIN}_sync_progress"
+EVENT_SYNC_COMPLETE: Final = f"{DOMAIN}_sync_complete"
+SYNC_ORDER_CONFIG: Final = "config"
+SYNC_ORDER_ADDRESS: Final = "address"
+SYNC_ORDERS: Final = [SYNC_ORDER_CONFIG, SYNC_ORDER_ADDRESS]
+
+# Aggregates published from the states of several entities
+AGGREGATE_ANY_ON: Final = "any_on"
+AGGREGATE_COUNT_ON: Final = "count_on"
+AGGREGATE_AVERAGE_TEMPERATURE: Final = "average_temperature"
+AGGREGATE_TYPES: Final = [
+    AGGREGATE_ANY_ON,
+    AGGREGATE_COUNT_ON,
+    AGGREGATE_AVERAGE_TEMPERATURE,
+]
+
+# Seconds a service call for a synced entity may take. After BREAKER_THRESHOLD
+# failed or timed out calls in a row, calls for the entity are skipped for
+# BREAKER_COOLDOWN seconds
+SERVICE_CALL_TIMEOUT: Final = 10
+BREAKER_THRESHOLD: Final = 3
+BREAKER_COOLDOWN: Final = 60
+BREAKER_CLOSED: Final = "closed"
+BREAKER_OPEN: Final = "open"
+BREAKER_HALF_OPEN: Final = "half_open"
+
+# Records kept by the trace recorder, older ones are dropped
+TRACE_BUFFER_SIZE: Final = 10000
+SERVICE_DUMP_TRACE: Final = "dump_trace"
+ATTR_FILENAME: Final = "filename"
+
+# Known values and last sent telegrams survive restarts in this store, saved
+# at most every STORAGE_SAVE_DELAY seconds
+STORAGE_VERSION: Final = 1
+STORAGE_SAVE_DELAY: Final = 30
+
+# Telegrams that may wait per synced entity before new ones are dropped
+WORKER_QUEUE_SIZE: Final = 64
+# Weight of the newest sample in the per entity latency average
+WORKER_LATENCY_SMOOTHING: Final = 0.2
+# Seconds to wait before retrying a coalesced call that did not fit the queue
+COALESCE_RETRY_DELAY: Final = 0.1
+# Light status changes less than status_throttle apart that are still sent right
+# away, more in a row mean a transition is running and are throttled
+LIGHT_TRANSITION_BURST: Final = 2
+
 CONF_KNXSYNC_SYNCED_ENTITIES: Final = "synced_entities"
+CONF_KNXSYNC_RESEND_MAX_AGE: Final = "resend_max_age"
+CONF_KNXSYNC_RATE_LIMIT: Final = "rate_limit"
+CONF_KNXSYNC_RATE_BURST: Final = "rate_burst"
+CONF_KNXSYNC_RATE_ADAPTIVE: Final = "rate_adaptive"
+CONF_KNXSYNC_READ_COALESCE_WINDOW: Final = "read_coalesce_window"
+CONF_KNXSYNC_INITIAL_SYNC: Final = "initial_sync"
+CONF_KNXSYNC_SYNC_ORDER: Final = "sync_order"
+CONF_KNXSYNC_TRACE: Final = "trace"
+
+CONF_KNXSYNC_AGGREGATES: Final = "aggregates"
+CONF_KNXSYNC_AGGREGATE_TYPE: Final = "type"
 
 CONF_KNXSYNC_BASE_ANSWER_READS: Final = "answer_reads"
+CONF_KNXSYNC_BASE_SUPPRESS_ECHO: Final = "suppress_echo"
 
 CONF_KNXSYNC_LIGHT_ZERO_BRIGHTNESS_WHEN_OFF: Final = "zero_brightness_when_off"
+CONF_KNXSYNC_LIGHT_BRIGHTNESS_COALESCE_WINDOW: Final = "brightness_coalesce_window"
+CONF_KNXSYNC_LIGHT_COLOR_COALESCE_WINDOW: Final = "color_coalesce_window"
+CONF_KNXSYNC_LIGHT_STATUS_THROTTLE: Final = "status_throttle"
+
+CONF_KNXSYNC_CLIMATE_SEND_DELTA: Final = "send_delta"
+CONF_KNXSYNC_CLIMATE_SEND_DELTA_RELATIVE: Final = "send_delta_relative"
+CONF_KNXSYNC_CLIMATE_SEND_MIN_INTERVAL: Final = "send_min_interval"
+CONF_KNXSYNC_CLIMATE_SEND_CYCLE: Final = "send_cycle"
 
 
 class KNXSyncEntityBaseData(TypedDict, total=False):
     answer_reads: bool | None
+    suppress_echo: bool | None
 
 
 class KNXSyncEntityLightData(KNXSyncEntityBaseData):
@@ -25,6 +125,9 @@ class KNXSyncEntityLightData(KNXSyncEntityBaseData):
     zero_brightness_when_off: bool | None
     color_address: list[str] | None
     color_state_address: list[str] | None
+    brightness_coalesce_window: float | None
+    color_coalesce_window: float | None
+    status_throttle: float | None
 
 
 class KNXSyncEntityClimateData(KNXSyncEntityBaseData):
@@ -35,13 +138,32 @@ class KNXSyncEntityClimateData(KNXSyncEntityBaseData):
     operation_mode_state_address: bool | None
     controller_mode_address: list[str] | None
     controller_mode_state_address: list[str] | None
+    send_delta: float | None
+    send_delta_relative: bool | None
+    send_min_interval: float | None
+    send_cycle: float | None
 
 
 class KNXSyncEntityBinarySensorData(KNXSyncEntityBaseData):
     state_address: list[str] | None
 
 
+class KNXSyncAggregateData(TypedDict, total=False):
+    type: str
+    address: list[str]
+    entities: list[str]
+
+
 class KNXSyncEntryData(TypedDict, total=False):
+    resend_max_age: float | None
+    rate_limit: float | None
+    rate_burst: float | None
+    rate_adaptive: bool | None
+    read_coalesce_window: float | None
+    initial_sync: bool | None
+    sync_order: str | None
+    trace: bool | None
+    aggregates: Mapping[str, KNXSyncAggregateData] | None
     synced_entities: Mapping[
         str,
         KNXSyncEntityLightData
@@ -0,0 +1,31 @@
+from typing import Any
+
+from . import KnxSyncConfigEntry
+from .helpers import format_group_addresses
+
+from homeassistant.core import HomeAssistant
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: KnxSyncConfigEntry
+) -> dict[str, Any]:
+    syncer = entry.runtime_data.syncer
+    return {
+        "config": dict(entry.data),
+        "routes": len(syncer.routes),
+        "group_addresses": format_group_addresses(
+            {address for address, _ in syncer.routes}
+        ),
+        "setup_duration": syncer.setup_duration,
+        "last_sync": syncer.last_sync,
+        "transport": syncer.transport.as_dict(),
+        "service_calls": syncer.batcher.as_dict(),
+        "workers": {
+            synced_entity_id: synced_entity.worker.as_dict()
+            for synced_entity_id, synced_entity in syncer.synced_entities.items()
+        },
+        "breakers": {
+            synced_entity_id: synced_entity.breaker.as_dict()
+            for synced_entity_id, synced_entity in syncer.synced_entities.items()
+        },
+    }
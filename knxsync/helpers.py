@@ -1,13 +1,21 @@
-import voluptuous as vol
+import logging
+from collections.abc import Iterable, Mapping
+from functools import lru_cache
 from typing import Optional, Any
 
-from .const import KNXSyncEntityLightData
+from .const import (
+    KNXSyncEntityLightData,
+    DOMAIN,
+    CONF_KNXSYNC_SYNCED_ENTITIES,
+    GROUP_ADDRESS_CACHE_SIZE,
+)
 
 from homeassistant.const import CONF_ADDRESS
-from homeassistant.components.knx.schema import ga_list_validator
 from homeassistant.components.knx.const import CONF_STATE_ADDRESS
 from homeassistant.components.knx.light import LightSchema
 
+_LOGGER = logging.getLogger(DOMAIN)
+
 
 def get_domain(eid: str) -> str:
     return eid.split(".")[0]
@@ -17,43 +25,102 @@ def get_id(eid: str) -> str:
     return eid.split(".")[1]
 
 
+def get_settings(config: Mapping[str, Any]) -> dict[str, Any]:
+    # Everything in the entry data that is not the per entity configuration
+    return {
+        key: value
+        for key, value in config.items()
+        if key != CONF_KNXSYNC_SYNCED_ENTITIES
+    }
+
+
 def parse_group_addresses(s: str) -> Optional[list[str]]:
     return list(filter(None, list(map(lambda x: x.strip(), s.split(","))))) or None
 
 
+@lru_cache(maxsize=GROUP_ADDRESS_CACHE_SIZE)
+def parse_ga(address: str) -> int:
+    """Convert a group address string to its 16 bit integer representation.
+
+    Accepts three level ("1/2/3"), two level ("1/515") and free ("2563") style.
+    The cache interns the destinations of inbound telegrams, so each distinct
+    string on the bus is only parsed once.
+    """
+    parts = address.split("/")
+    if len(parts) == 3:
+        main, middle, sub = (int(part) for part in parts)
+        if 0 <= main <= 31 and 0 <= middle <= 7 and 0 <= sub <= 255:
+            return (main << 11) | (middle << 8) | sub
+    elif len(parts) == 2:
+        main, sub = (int(part) for part in parts)
+        if 0 <= main <= 31 and 0 <= sub <= 2047:
+            return (main << 11) | sub
+    elif len(parts) == 1:
+        raw = int(address)
+        if 0 <= raw <= 65535:
+            return raw
+    raise ValueError(f"Invalid group address '{address}'")
+
+
+def ga_to_str(address: int) -> str:
+    return f"{address >> 11}/{(address >> 8) & 7}/{address & 255}"
+
+
+def format_group_addresses(addresses: Iterable[int]) -> str:
+    return ", ".join(ga_to_str(address) for address in sorted(addresses))
+
+
+def compile_group_addresses(addresses: list[str] | str | None) -> frozenset[int]:
+    if not addresses:
+        return frozenset()
+    if type(addresses) is str:
+        # Old style config, convert to list
+        addresses = parse_group_addresses(addresses) or list()
+    return _compile_group_addresses(tuple(addresses))
+
+
+@lru_cache(maxsize=GROUP_ADDRESS_CACHE_SIZE)
+def _compile_group_addresses(addresses: tuple[str, ...]) -> frozenset[int]:
+    # Cached so entities configured with the same addresses share one table
+    compiled = set()
+    for address in addresses:
+        try:
+            compiled.add(parse_ga(address))
+        except ValueError:
+            _LOGGER.error(f"Ignoring invalid group address '{address}'")
+    return frozenset(compiled)
+
+
+async def async_validate_aggregate_config(
+    user_input: dict[str, Any],
+) -> dict[str, str]:
+    errors = {}
+    try:
+        for address in user_input.get(CONF_ADDRESS) or list():
+            parse_ga(address)
+    except ValueError:
+        errors[CONF_ADDRESS] = "invalid_ga"
+    return errors
+
+
 async def async_validate_light_config(user_input: dict[str, Any]) -> dict[str, str]:
     errors = {}
     if user_input is None:
         errors["base"] = "Input was empty"
         return errors
 
-    # TODO: does not work on empty lists...
-    # TODO: also does not forward the actual error
-    # try:
-    #     ga_list_validator(user_input.get(CONF_ADDRESS, list()))
-    # except vol.Invalid:
-    #     errors[CONF_ADDRESS] = "invalid_ga"
-    # try:
-    #     ga_list_validator(user_input.get(CONF_STATE_ADDRESS, list()))
-    # except vol.Invalid:
-    #     errors[CONF_STATE_ADDRESS] = "invalid_ga"
-    # try:
-    #     ga_list_validator(user_input.get(LightSchema.CONF_BRIGHTNESS_ADDRESS, list()))
-    # except vol.Invalid:
-    #     errors[LightSchema.CONF_BRIGHTNESS_ADDRESS] = "invalid_ga"
-    # try:
-    #     ga_list_validator(
-    #         user_input.get(LightSchema.CONF_BRIGHTNESS_STATE_ADDRESS, list())
-    #     )
-    # except vol.Invalid:
-    #     errors[LightSchema.CONF_BRIGHTNESS_STATE_ADDRESS] = "invalid_ga"
-    # try:
-    #     ga_list_validator(user_input.get(LightSchema.CONF_COLOR_ADDRESS, list()))
-    # except vol.Invalid:
-    #     errors[LightSchema.CONF_COLOR_ADDRESS] = "invalid_ga"
-    # try:
-    #     ga_list_validator(user_input.get(LightSchema.CONF_COLOR_STATE_ADDRESS, list()))
-    # except vol.Invalid:
-    #     errors[LightSchema.CONF_COLOR_STATE_ADDRESS] = "invalid_ga"
+    for key in (
+        CONF_ADDRESS,
+        CONF_STATE_ADDRESS,
+        LightSchema.CONF_BRIGHTNESS_ADDRESS,
+        LightSchema.CONF_BRIGHTNESS_STATE_ADDRESS,
+        LightSchema.CONF_COLOR_ADDRESS,
+        LightSchema.CONF_COLOR_STATE_ADDRESS,
+    ):
+        try:
+            for address in user_input.get(key) or list():
+                parse_ga(address)
+        except ValueError:
+            errors[key] = "invalid_ga"
 
     return errors
@@ -1,4 +1,8 @@
 import logging
+from collections.abc import Iterator
+from datetime import datetime
+from functools import partial
+from typing import Any
 
 from .const import (
     KNXSyncEntityLightData,
@@ -6,16 +10,26 @@ from .const import (
     TELEGRAMTYPE_READ,
     TELEGRAMTYPE_WRITE,
     CONF_KNXSYNC_LIGHT_ZERO_BRIGHTNESS_WHEN_OFF,
+    CONF_KNXSYNC_LIGHT_BRIGHTNESS_COALESCE_WINDOW,
+    CONF_KNXSYNC_LIGHT_COLOR_COALESCE_WINDOW,
+    CONF_KNXSYNC_LIGHT_STATUS_THROTTLE,
+    COALESCE_RETRY_DELAY,
+    LIGHT_TRANSITION_BURST,
 )
-from .base import SyncedEntity
+from .base import SyncedEntity, TelegramHandler
+from .helpers import compile_group_addresses
+from .throttle import SendOnDelta
+from .batch import ServiceBatcher
+from .transport import KNXTransport
 
-from homeassistant.core import Event, HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, State, callback
 from homeassistant.const import (
-    ATTR_ENTITY_ID,
+    ATTR_STATE,
     CONF_ADDRESS,
     SERVICE_TURN_ON,
     SERVICE_TURN_OFF,
     STATE_ON,
+    STATE_OFF,
     STATE_UNKNOWN,
     STATE_UNAVAILABLE,
 )
@@ -24,227 +38,345 @@ from homeassistant.components.light import (
     ATTR_RGB_COLOR,
     ATTR_BRIGHTNESS,
 )
-from homeassistant.components.knx.const import (
-    DOMAIN as DOMAIN_KNX,
-    SERVICE_KNX_SEND,
-    SERVICE_KNX_ATTR_PAYLOAD,
-    SERVICE_KNX_ATTR_RESPONSE,
-    CONF_STATE_ADDRESS,
-    KNX_ADDRESS,
-)
+from homeassistant.components.knx.const import CONF_STATE_ADDRESS
 from homeassistant.components.knx.schema import LightSchema
+from homeassistant.helpers.event import async_call_later
+from xknx.dpt.payload import DPTArray, DPTBinary
 
 _LOGGER = logging.getLogger(DOMAIN)
 
 
 class SyncedLight(SyncedEntity):
-    address: list[str]
-    state_address: list[str]
-    brightness_address: list[str]
-    brightness_state_address: list[str]
+    __slots__ = (
+        "address",
+        "state_address",
+        "brightness_address",
+        "brightness_state_address",
+        "zero_brightness_when_off",
+        "color_address",
+        "color_state_address",
+        "brightness_coalesce_window",
+        "color_coalesce_window",
+        "onoff",
+        "brightness",
+        "rgb_color",
+        "_pending_service",
+        "_pending_data",
+        "_pending_address",
+        "_pending_onoff",
+        "_flush_timer",
+        "_flush_queued",
+        "_brightness_throttle",
+        "_color_throttle",
+    )
+
+    address: frozenset[int]
+    state_address: frozenset[int]
+    brightness_address: frozenset[int]
+    brightness_state_address: frozenset[int]
     zero_brightness_when_off: bool
-    color_address: list[str]
-    color_state_address: list[str]
+    color_address: frozenset[int]
+    color_state_address: frozenset[int]
+    brightness_coalesce_window: float
+    color_coalesce_window: float
+    # Published state, onoff is the HA state string and None without a state
+    onoff: str | None
+    brightness: int | None
+    rgb_color: tuple[int, ...] | None
 
     def __init__(
         self,
         hass: HomeAssistant,
+        transport: KNXTransport,
+        batcher: ServiceBatcher,
         synced_entity_id: str,
         entity_config: KNXSyncEntityLightData,
     ):
-        super().__init__(hass, synced_entity_id, entity_config)
+        super().__init__(hass, transport, batcher, synced_entity_id, entity_config)
         _LOGGER.debug(f"Setting up synced light '{self.synced_entity_id}'")
 
-        self._set_value_from_config(CONF_ADDRESS, list())
-        self._set_value_from_config(CONF_STATE_ADDRESS, list())
-        self._set_value_from_config(LightSchema.CONF_BRIGHTNESS_ADDRESS, list())
-        self._set_value_from_config(LightSchema.CONF_BRIGHTNESS_STATE_ADDRESS, list())
-        self._set_value_from_config(CONF_KNXSYNC_LIGHT_ZERO_BRIGHTNESS_WHEN_OFF, False)
-        self._set_value_from_config(LightSchema.CONF_COLOR_ADDRESS, list())
-        self._set_value_from_config(LightSchema.CONF_COLOR_STATE_ADDRESS, list())
+        self.address = compile_group_addresses(entity_config.get(CONF_ADDRESS))
+        self.state_address = compile_group_addresses(
+            entity_config.get(CONF_STATE_ADDRESS)
+        )
+        self.brightness_address = compile_group_addresses(
+            entity_config.get(LightSchema.CONF_BRIGHTNESS_ADDRESS)
+        )
+        self.brightness_state_address = compile_group_addresses(
+            entity_config.get(LightSchema.CONF_BRIGHTNESS_STATE_ADDRESS)
+        )
+        self.zero_brightness_when_off = entity_config.get(
+            CONF_KNXSYNC_LIGHT_ZERO_BRIGHTNESS_WHEN_OFF, False
+        )
+        self.color_address = compile_group_addresses(
+            entity_config.get(LightSchema.CONF_COLOR_ADDRESS)
+        )
+        self.color_state_address = compile_group_addresses(
+            entity_config.get(LightSchema.CONF_COLOR_STATE_ADDRESS)
+        )
+        self.brightness_coalesce_window = entity_config.get(
+            CONF_KNXSYNC_LIGHT_BRIGHTNESS_COALESCE_WINDOW, 0
+        )
+        self.color_coalesce_window = entity_config.get(
+            CONF_KNXSYNC_LIGHT_COLOR_COALESCE_WINDOW, 0
+        )
 
-    async def async_got_telegram(self, event: Event) -> None:
-        data = event.data
-        address = data["destination"]
-        type = data["telegramtype"]
-
-        if type == TELEGRAMTYPE_WRITE:
-            if address in self.address:
-                payload = data["data"]
-                if payload == 1:
-                    _LOGGER.debug(f"Turning {self.synced_entity_id} on <- {address}")
-                    await self.hass.services.async_call(
-                        DOMAIN_LIGHT,
-                        SERVICE_TURN_ON,
-                        {ATTR_ENTITY_ID: self.synced_entity_id},
-                    )
-                elif payload == 0:
-                    _LOGGER.debug(f"Turning {self.synced_entity_id} off <- {address}")
-                    await self.hass.services.async_call(
-                        DOMAIN_LIGHT,
-                        SERVICE_TURN_OFF,
-                        {ATTR_ENTITY_ID: self.synced_entity_id},
-                    )
-
-            if address in self.brightness_address:
-                payload = data["data"]
-                if payload[0] == 0:
-                    _LOGGER.debug(
-                        f"Turning {self.synced_entity_id} off with brightness <- {address}"
-                    )
-                    await self.hass.services.async_call(
-                        DOMAIN_LIGHT,
-                        SERVICE_TURN_OFF,
-                        {ATTR_ENTITY_ID: self.synced_entity_id},
-                    )
-                else:
-                    _LOGGER.debug(
-                        f"Turning {self.synced_entity_id} on with brightness <- {address}"
-                    )
-                    await self.hass.services.async_call(
-                        DOMAIN_LIGHT,
-                        SERVICE_TURN_ON,
-                        {
-                            ATTR_ENTITY_ID: self.synced_entity_id,
-                            ATTR_BRIGHTNESS: payload[0],
-                        },
-                    )
-
-            if address in self.color_address:
-                payload = data["data"]
-                if len(payload) == 3:
-                    _LOGGER.debug(
-                        f"Turning {self.synced_entity_id} on with color <- {address}"
-                    )
-                    await self.hass.services.async_call(
-                        DOMAIN_LIGHT,
-                        SERVICE_TURN_ON,
-                        {
-                            ATTR_ENTITY_ID: self.synced_entity_id,
-                            ATTR_RGB_COLOR: payload,
-                        },
-                    )
-        elif type == TELEGRAMTYPE_READ and self.answer_reads and self.state is not None:
-            _LOGGER.debug(f"Reading state for {self.synced_entity_id} <- {address}")
-            if address in self.state_address:
-                await self._send_onoff(True)
-            if address in self.brightness_state_address:
-                await self._send_brightness(True)
-            if address in self.color_state_address:
-                await self._send_color(True)
+        # Inbound writes waiting to be merged into a single service call
+        self._pending_service: str | None = None
+        self._pending_data: dict[str, Any] = {}
+        self._pending_address: str = ""
+        # Whether KNX itself wrote the on/off value of the pending call
+        self._pending_onoff = False
+        self._flush_timer: CALLBACK_TYPE | None = None
+        self._flush_queued = False
 
-    async def async_state_changed(self, event: Event) -> None:
-        data = event.data
+        # Status telegrams during transitions are limited to one per interval,
+        # the settled value is sent when it is over. A transition is running once
+        # more than LIGHT_TRANSITION_BURST changes came less than the interval apart.
+        status_throttle = entity_config.get(CONF_KNXSYNC_LIGHT_STATUS_THROTTLE, 0)
+        self._brightness_throttle = SendOnDelta(
+            hass,
+            partial(self._send_brightness, True),
+            min_interval=status_throttle / 1000,
+            burst=LIGHT_TRANSITION_BURST,
+        )
+        self._color_throttle = SendOnDelta(
+            hass,
+            partial(self._send_color, True),
+            min_interval=status_throttle / 1000,
+            burst=LIGHT_TRANSITION_BURST,
+        )
 
-        if "new_state" not in data.keys():
-            return
-        self.state = data["new_state"]
-        if self.state is None:
-            return
+        # Fill in the values for reads without sending them
+        self._publish_state(send=False)
 
-        if self.state.state == STATE_UNKNOWN or self.state.state == STATE_UNAVAILABLE:
-            _LOGGER.debug(f"{self.synced_entity_id} is unknown/unavailable")
-            await self._send_onoff()
+    def _update_state(self, state: State | None) -> None:
+        super()._update_state(state)
+        if state is None:
+            self.onoff = self.brightness = self.rgb_color = None
             return
+        self.onoff = state.state
+        self.brightness = state.attributes.get(ATTR_BRIGHTNESS)
+        rgb_color = state.attributes.get(ATTR_RGB_COLOR)
+        self.rgb_color = tuple(rgb_color) if rgb_color is not None else None
 
-        if self.state_address:
-            await self._send_onoff()
-        if (
-            self.brightness_state_address
-            and self.state.attributes[ATTR_BRIGHTNESS] is not None
-        ):
-            await self._send_brightness()
-        if self.color_state_address and self.state.attributes[ATTR_RGB_COLOR] is not None:
-            await self._send_color()
+    @property
+    def idle(self) -> bool:
+        # Writes waiting for their merge window count as well
+        return (
+            super().idle
+            and self._flush_timer is None
+            and self._pending_service is None
+        )
 
-    async def async_setup_events(self) -> None:
-        await self._register_receiver(CONF_ADDRESS)
-        await self._register_receiver(LightSchema.CONF_BRIGHTNESS_ADDRESS)
-        await self._register_receiver(LightSchema.CONF_COLOR_ADDRESS)
+    def get_routes(self) -> Iterator[tuple[int, str, TelegramHandler]]:
+        for address in self.address:
+            yield address, TELEGRAMTYPE_WRITE, self._async_got_onoff
+        for address in self.brightness_address:
+            yield address, TELEGRAMTYPE_WRITE, self._async_got_brightness
+        for address in self.color_address:
+            yield address, TELEGRAMTYPE_WRITE, self._async_got_color
 
         if not self.answer_reads:
             return
 
-        # Register for potential reads
-        await self._register_receiver(CONF_STATE_ADDRESS)
-        await self._register_receiver(LightSchema.CONF_BRIGHTNESS_STATE_ADDRESS)
-        await self._register_receiver(LightSchema.CONF_COLOR_STATE_ADDRESS)
+        for address in (
+            self.state_address
+            | self.brightness_state_address
+            | self.color_state_address
+        ):
+            yield address, TELEGRAMTYPE_READ, self._async_answer_read
+
+    def get_state_addresses(self) -> Iterator[int]:
+        yield from sorted(self.state_address)
+        yield from sorted(self.brightness_state_address)
+        yield from sorted(self.color_state_address)
 
-    async def _send_onoff(self, response: bool = False) -> None:
-        if self.state == None:
-            return
-        if self.state.state == STATE_ON:
-            _LOGGER.debug(f"Sending {self.synced_entity_id} on -> {self.state_address}")
-            payload = 1
+    async def _async_got_onoff(self, address: str, payload: Any) -> None:
+        if payload == 1:
+            _LOGGER.debug(f"Turning {self.synced_entity_id} on <- {address}")
+            self._coalesce(address, SERVICE_TURN_ON, {}, 0, onoff=True)
+        elif payload == 0:
+            _LOGGER.debug(f"Turning {self.synced_entity_id} off <- {address}")
+            self._coalesce(address, SERVICE_TURN_OFF, {}, 0, onoff=True)
+
+    async def _async_got_brightness(self, address: str, payload: Any) -> None:
+        if payload[0] == 0:
+            _LOGGER.debug(
+                f"Turning {self.synced_entity_id} off with brightness <- {address}"
+            )
+            # Switching off is what KNX expects brightness 0 to do
+            self._coalesce(
+                address,
+                SERVICE_TURN_OFF,
+                {},
+                self.brightness_coalesce_window,
+                onoff=True,
+            )
         else:
             _LOGGER.debug(
-                f"Sending {self.synced_entity_id} off -> {self.state_address}"
+                f"Turning {self.synced_entity_id} on with brightness <- {address}"
+            )
+            self._coalesce(
+                address,
+                SERVICE_TURN_ON,
+                {ATTR_BRIGHTNESS: payload[0]},
+                self.brightness_coalesce_window,
+            )
+
+    async def _async_got_color(self, address: str, payload: Any) -> None:
+        if len(payload) == 3:
+            _LOGGER.debug(f"Turning {self.synced_entity_id} on with color <- {address}")
+            self._coalesce(
+                address,
+                SERVICE_TURN_ON,
+                {ATTR_RGB_COLOR: payload},
+                self.color_coalesce_window,
+            )
+
+    def _coalesce(
+        self,
+        address: str,
+        service: str,
+        data: dict[str, Any],
+        window: float,
+        onoff: bool = False,
+    ) -> None:
+        # Merge the write into the pending call, the newest value always wins.
+        # Turning off discards pending attributes, turning on keeps them.
+        # onoff is set for writes that set the on/off value on the KNX side.
+        if service == SERVICE_TURN_OFF or self._pending_service == SERVICE_TURN_OFF:
+            self._pending_data = {}
+        if onoff:
+            self._pending_onoff = True
+        elif service != self._pending_service:
+            self._pending_onoff = False
+        self._pending_service = service
+        self._pending_data.update(data)
+        self._pending_address = address
+
+        if self._flush_queued:
+            # The queued flush has not run yet and will carry this value
+            return
+        if window > 0:
+            if self._flush_timer is None:
+                self._flush_timer = async_call_later(
+                    self.hass, window / 1000, self._queue_flush
+                )
+            return
+        self._queue_flush()
+
+    @callback
+    def _queue_flush(self, _: datetime | None = None) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer()
+            self._flush_timer = None
+        # Flushing through the worker keeps the service calls in telegram order
+        if self.worker.try_put(self._async_flush, self._pending_address, None):
+            self._flush_queued = True
+        else:
+            self._flush_timer = async_call_later(
+                self.hass, COALESCE_RETRY_DELAY, self._queue_flush
             )
-            payload = 0
-        for address in self.state_address:
-            await self.hass.services.async_call(
-                DOMAIN_KNX,
-                SERVICE_KNX_SEND,
-                {
-                    KNX_ADDRESS: address,
-                    SERVICE_KNX_ATTR_PAYLOAD: payload,
-                    SERVICE_KNX_ATTR_RESPONSE: response,
-                },
+
+    async def _async_flush(self, address: str, _: Any) -> None:
+        self._flush_queued = False
+        service = self._pending_service
+        data = self._pending_data
+        onoff = self._pending_onoff
+        self._pending_service = None
+        self._pending_data = {}
+        self._pending_onoff = False
+        if service is None:
+            return
+
+        # Only values KNX wrote are echoes, e.g. the on/off status still has to
+        # be sent when only the brightness was written
+        echo: dict[str, Any] = {}
+        if onoff:
+            echo[ATTR_STATE] = STATE_ON if service == SERVICE_TURN_ON else STATE_OFF
+        if ATTR_BRIGHTNESS in data:
+            echo[ATTR_BRIGHTNESS] = data[ATTR_BRIGHTNESS]
+        if ATTR_RGB_COLOR in data:
+            echo[ATTR_RGB_COLOR] = tuple(data[ATTR_RGB_COLOR])
+
+        _LOGGER.debug(f"Calling {service} for {self.synced_entity_id} <- {address}")
+        await self._async_call_service(DOMAIN_LIGHT, service, data, echo)
+
+    async def async_state_changed(self, event: Event) -> None:
+        data = event.data
+
+        if "new_state" not in data.keys():
+            return
+        self._update_state(data["new_state"])
+        self._publish_state()
+
+    def _publish_state(self, send: bool = True) -> None:
+        if self.onoff is None:
+            return
+
+        if self.onoff == STATE_UNKNOWN or self.onoff == STATE_UNAVAILABLE:
+            _LOGGER.debug(f"{self.synced_entity_id} is unknown/unavailable")
+            self._send_onoff(send)
+            return
+
+        if self.state_address:
+            self._send_onoff(send)
+        if self.brightness_state_address and self.brightness is not None:
+            self._send_brightness(
+                send and self._brightness_throttle.check(self.brightness)
             )
+        if self.color_state_address and self.rgb_color is not None:
+            self._send_color(send and self._color_throttle.check(self.rgb_color))
+
+    async def async_shutdown(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer()
+            self._flush_timer = None
+        self._brightness_throttle.cancel()
+        self._color_throttle.cancel()
+        await super().async_shutdown()
+
+    @callback
+    def _send_onoff(self, send: bool = True) -> None:
+        payload = DPTBinary(1 if self.onoff == STATE_ON else 0)
         if (
-            not response
-            and self.brightness_state_address is not None
+            self._publish(
+                "on/off", self.state_address, payload, send, ATTR_STATE, self.onoff
+            )
             and self.zero_brightness_when_off
-            and payload == 0
+            and payload.value == 0
         ):
-            payload = [0]
-            for address in self.brightness_state_address:
-                await self.hass.services.async_call(
-                    DOMAIN_KNX,
-                    SERVICE_KNX_SEND,
-                    {KNX_ADDRESS: address, SERVICE_KNX_ATTR_PAYLOAD: payload},
-                )
+            self._publish(
+                "brightness", self.brightness_state_address, DPTArray((0,)), send
+            )
 
-    async def _send_brightness(self, response: bool = False) -> None:
-        if self.state == None:
-            return
-        brightness = self.state.attributes[ATTR_BRIGHTNESS]
-        if brightness is None:
+    @callback
+    def _send_brightness(self, send: bool = True, force: bool = False) -> None:
+        if self.brightness is None:
+            # Throttled sends may run after the light was turned off
             return
         # brightness is an int between 0 and 255, no conversion needed
-        payload = [brightness]  # XKNX requires a list for 1 byte payload
-        _LOGGER.debug(
-            f"Sending {self.synced_entity_id} brightness -> {self.brightness_state_address}"
+        self._publish(
+            "brightness",
+            self.brightness_state_address,
+            DPTArray((self.brightness,)),
+            send,
+            ATTR_BRIGHTNESS,
+            self.brightness,
+            force,
         )
-        for address in self.brightness_state_address:
-            await self.hass.services.async_call(
-                DOMAIN_KNX,
-                SERVICE_KNX_SEND,
-                {
-                    KNX_ADDRESS: address,
-                    SERVICE_KNX_ATTR_PAYLOAD: payload,
-                    SERVICE_KNX_ATTR_RESPONSE: response,
-                },
-            )
 
-    async def _send_color(self, reponse: bool = False) -> None:
-        if self.state == None:
+    @callback
+    def _send_color(self, send: bool = True, force: bool = False) -> None:
+        if self.rgb_color is None:
             return
-        rgb = self.state.attributes[ATTR_RGB_COLOR]
-        if rgb is None:
-            return
-        # rgb is a tuple, so convert to a list
-        payload = list(rgb)
-        _LOGGER.debug(
-            f"Sending {self.synced_entity_id} color -> {self.color_state_address}"
+        self._publish(
+            "color",
+            self.color_state_address,
+            DPTArray(self.rgb_color),
+            send,
+            ATTR_RGB_COLOR,
+            self.rgb_color,
+            force,
         )
-        for address in self.color_state_address:
-            await self.hass.services.async_call(
-                DOMAIN_KNX,
-                SERVICE_KNX_SEND,
-                {
-                    KNX_ADDRESS: address,
-                    SERVICE_KNX_ATTR_PAYLOAD: payload,
-                    SERVICE_KNX_ATTR_RESPONSE: reponse,
-                },
-            )
@@ -0,0 +1,130 @@
+import math
+import time
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+
+class SendOnDelta:
+    """Decides when a changing value is sent, like the send-on-delta parameters
+    of KNX sensors.
+
+    A value is sent when it differs from the last sent one by at least delta,
+    in percent of the last sent value if relative is set (0 sends every value).
+    Values are sent at most once per min_interval seconds, the newest value is
+    sent when the interval is over. With burst set, the first burst values of a
+    run of values less than min_interval apart are sent right away and only the
+    rest of the run is limited, e.g. the intermediate states of a transition.
+    With cycle set, the current value is sent again after cycle seconds without
+    a send.
+
+    check decides for values that are sent by the caller itself, send is called
+    with force set for cyclic sends of values the bus already has. Those go out
+    in the lowest priority class, like bulk sends, and are not dropped when an
+    unchanged value replaces them while they wait.
+    """
+
+    __slots__ = (
+        "hass",
+        "delta",
+        "relative",
+        "min_interval",
+        "cycle",
+        "burst",
+        "_send",
+        "_value",
+        "_sent_value",
+        "_sent_at",
+        "_changed_at",
+        "_run",
+        "_trailing",
+        "_cyclic",
+    )
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        send: Callable[[bool], None],
+        delta: float = 0,
+        relative: bool = False,
+        min_interval: float = 0,
+        cycle: float = 0,
+        burst: int = 0,
+    ) -> None:
+        self.hass = hass
+        self.delta = delta
+        self.relative = relative
+        self.min_interval = min_interval
+        self.cycle = cycle
+        self.burst = burst
+        self._send = send
+        self._value: Any = None
+        self._sent_value: Any = None
+        self._sent_at = -math.inf
+        # When the last value came and how many came less than min_interval apart
+        self._changed_at = -math.inf
+        self._run = 0
+        self._trailing: CALLBACK_TYPE | None = None
+        self._cyclic: CALLBACK_TYPE | None = None
+
+    @callback
+    def check(self, value: Any) -> bool:
+        # Whether value is to be sent now, otherwise it may be sent later
+        now = time.monotonic()
+        self._run = self._run + 1 if now - self._changed_at < self.min_interval else 1
+        self._changed_at = now
+        self._value = value
+        if not self._exceeds_delta(value):
+            self._cancel_trailing()
+            return False
+        wait = self._sent_at + self.min_interval - now
+        if wait > 0 and self._run > self.burst:
+            if self._trailing is None:
+                self._trailing = async_call_later(self.hass, wait, self._send_trailing)
+            return False
+        self._mark_sent()
+        return True
+
+    def _exceeds_delta(self, value: Any) -> bool:
+        if self.delta <= 0 or self._sent_value is None:
+            return True
+        change = abs(value - self._sent_value)
+        if self.relative:
+            return change * 100 >= self.delta * abs(self._sent_value)
+        return change >= self.delta
+
+    def _mark_sent(self) -> None:
+        self._sent_value = self._value
+        self._sent_at = time.monotonic()
+        self._cancel_trailing()
+        if self.cycle > 0:
+            if self._cyclic is not None:
+                self._cyclic()
+            self._cyclic = async_call_later(self.hass, self.cycle, self._send_cyclic)
+
+    @callback
+    def _send_trailing(self, _: datetime) -> None:
+        self._trailing = None
+        self._mark_sent()
+        self._send(False)
+
+    @callback
+    def _send_cyclic(self, _: datetime) -> None:
+        self._cyclic = None
+        self._mark_sent()
+        self._send(True)
+
+    def _cancel_trailing(self) -> None:
+        if self._trailing is not None:
+            self._trailing()
+            self._trailing = None
+
+    @callback
+    def cancel(self) -> None:
+        self._cancel_trailing()
+        if self._cyclic is not None:
+            self._cyclic()
+            self._cyclic = None
@@ -0,0 +1,88 @@
+import json
+import logging
+import time
+from collections import deque
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+from .const import DOMAIN
+
+from homeassistant.core import HomeAssistant, State
+from homeassistant.helpers.json import JSONEncoder
+
+_LOGGER = logging.getLogger(DOMAIN)
+
+TRACE_TELEGRAM = "telegram"
+TRACE_STATE = "state"
+
+
+class TraceRecorder:
+    """Records the telegrams and state changes handled by knxsync.
+
+    Records are kept as tuples in a ring buffer of size entries and written as
+    JSON lines by async_dump, one object per record with its wall clock time.
+    Telegrams carry destination, telegram type and payload, state changes the
+    entity id, state and attributes of the new state. scripts/replay_trace.py
+    feeds such a file through a KNXSyncer again.
+    """
+
+    __slots__ = ("hass", "_records")
+
+    def __init__(self, hass: HomeAssistant, size: int) -> None:
+        self.hass = hass
+        self._records: deque[tuple] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def record_telegram(self, event_data: Mapping[str, Any]) -> None:
+        self._records.append(
+            (
+                time.time(),
+                TRACE_TELEGRAM,
+                event_data["destination"],
+                event_data["telegramtype"],
+                event_data.get("data"),
+            )
+        )
+
+    def record_state(self, entity_id: str, state: State | None) -> None:
+        # State attributes are immutable, keeping a reference costs nothing
+        self._records.append(
+            (
+                time.time(),
+                TRACE_STATE,
+                entity_id,
+                state.state if state is not None else None,
+                state.attributes if state is not None else None,
+            )
+        )
+
+    async def async_dump(self, path: str) -> int:
+        # Returns the number of records written
+        records = list(self._records)
+        await self.hass.async_add_executor_job(_write_records, path, records)
+        _LOGGER.info(f"Wrote {len(records)} trace records to {path}")
+        return len(records)
+
+
+def _write_records(path: str, records: Iterable[tuple]) -> None:
+    with open(path, "w", encoding="utf-8") as trace_file:
+        for record in records:
+            if record[1] == TRACE_TELEGRAM:
+                line = {
+                    "time": record[0],
+                    "type": TRACE_TELEGRAM,
+                    "destination": record[2],
+                    "telegramtype": record[3],
+                    "data": record[4],
+                }
+            else:
+                line = {
+                    "time": record[0],
+                    "type": TRACE_STATE,
+                    "entity_id": record[2],
+                    "state": record[3],
+                    "attributes": record[4],
+                }
+            trace_file.write(json.dumps(line, cls=JSONEncoder) + "\n")
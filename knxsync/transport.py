@@ -0,0 +1,667 @@
+import asyncio
+import logging
+import math
+import time
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from .helpers import ga_to_str, parse_ga
+from .const import (
+    DOMAIN,
+    STORAGE_VERSION,
+    STORAGE_SAVE_DELAY,
+    PRIORITY_RESPONSE,
+    PRIORITY_STATE,
+    PRIORITY_BULK,
+    SYNC_CHUNK_SIZE,
+    AIMD_INCREASE,
+    AIMD_DECREASE,
+    AIMD_MIN_RATE,
+    AIMD_BACKOFF_HOLD,
+    CONGESTION_LATENCY,
+    CONGESTION_TIMEOUT,
+    TRANSPORT_LATENCY_SMOOTHING,
+    CONNECTION_CHECK_INTERVAL,
+)
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.components.knx.const import (
+    DOMAIN as DOMAIN_KNX,
+    SERVICE_KNX_SEND,
+    SERVICE_KNX_ATTR_PAYLOAD,
+    SERVICE_KNX_ATTR_RESPONSE,
+    KNX_ADDRESS,
+)
+from xknx import XKNX
+from xknx.core import XknxConnectionState
+from xknx.core.telegram_queue import TelegramQueue
+from xknx.dpt.payload import DPTArray, DPTBinary
+from xknx.telegram import GroupAddress, Telegram
+from xknx.telegram.apci import GroupValueResponse, GroupValueWrite
+
+_LOGGER = logging.getLogger(DOMAIN)
+
+
+@dataclass(slots=True)
+class OutboundTelegram:
+    payload: DPTBinary | DPTArray
+    response: bool
+    priority: int
+    queued: float
+    # Sent even if the bus should already have the value
+    force: bool = False
+
+
+class KNXTransport:
+    """Central outbound scheduler for telegrams to the KNX bus.
+
+    Payloads are queued per group address and priority class and sent by a
+    single task within a token bucket budget of rate telegrams per second
+    (0 is unlimited). Queuing a value for an address that is still waiting
+    replaces the older value instead of sending both.
+
+    Telegrams are queued directly into the xknx instance of the KNX integration.
+    The knx.send service is only used when that instance is not available.
+    The last value queued for every group address is kept encoded, so reads
+    are answered from it without asking the synced entity. Reads of an address
+    whose response is still waiting or was queued less than read_window
+    milliseconds ago are covered by that response.
+
+    Writes repeating the last payload sent to a group address are skipped unless
+    it is older than resend_max_age seconds (0 never resends).
+
+    While the KNX interface is disconnected nothing is sent. Telegrams keep
+    being queued and replaced per address, so after reconnecting only the
+    latest value of every address is sent, within the usual budget. Listeners
+    added with async_add_reconnect_listener are called on every reconnect.
+    When the KNX integration is reloaded, the state of its new xknx instance
+    is followed from the next send or connection check on.
+
+    With a store_key, known values and last sent payloads are saved to a store
+    and restored by async_load, so both are available right after a restart.
+    Saving only starts once async_load has run.
+
+    With adaptive set, the budget follows an additive increase / multiplicative
+    decrease controller between AIMD_MIN_RATE and rate. Every telegram the KNX
+    integration reports as sent quickly raises it a little, slow, lost or failed
+    telegrams halve it.
+    """
+
+    hass: HomeAssistant
+    resend_max_age: float
+    rate: float
+    current_rate: float
+    burst: float
+    adaptive: bool
+    read_window: float
+    sent: int
+    failed: int
+    suppressed: int
+    replaced: int
+    answered: int
+    coalesced_reads: int
+    backoffs: int
+    disconnects: int
+    latency: float
+    queue_delay: float
+    max_queue_delay: float
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        resend_max_age: float = 0,
+        rate: float = 0,
+        burst: float = 1,
+        adaptive: bool = False,
+        read_window: float = 0,
+        store_key: str | None = None,
+    ) -> None:
+        self.hass = hass
+        self.resend_max_age = resend_max_age
+        self.rate = rate
+        self.current_rate = rate
+        self.burst = max(burst, 1)
+        self.adaptive = adaptive
+        self.read_window = read_window
+        self.sent = 0
+        self.failed = 0
+        self.suppressed = 0
+        self.replaced = 0
+        self.answered = 0
+        self.coalesced_reads = 0
+        self.backoffs = 0
+        self.disconnects = 0
+        # Seconds until the KNX integration reported the telegram as sent
+        self.latency = 0.0
+        # Seconds a telegram waited in our own queue
+        self.queue_delay = 0.0
+        self.max_queue_delay = 0.0
+        self._last_backoff = 0.0
+        # id(telegram) -> (telegram, monotonic time it was handed to xknx)
+        self._in_flight: dict[int, tuple[Telegram, float]] = {}
+        self._sent_cb_xknx: XKNX | None = None
+        self._sent_cb: TelegramQueue.Callback | None = None
+        # group address -> (payload, monotonic time it was sent)
+        self._last_sent: dict[int, tuple[DPTBinary | DPTArray, float]] = {}
+        # group address -> current value published by a synced entity
+        self._values: dict[int, DPTBinary | DPTArray] = {}
+        # group address -> monotonic time the last read of it was answered
+        self._answered_at: dict[int, float] = {}
+        # One insertion ordered queue per priority class, keyed by group address
+        self._pending: tuple[dict[int, OutboundTelegram], ...] = tuple(
+            {} for _ in range(PRIORITY_BULK + 1)
+        )
+        self._has_pending = asyncio.Event()
+        self._bulk_idle = asyncio.Event()
+        self._bulk_idle.set()
+        self._connection_xknx: XKNX | None = None
+        self._reconnect_listeners: list[CALLBACK_TYPE] = []
+        self.connected = False
+        # Cleared while the KNX interface is known to be disconnected
+        self._may_send = asyncio.Event()
+        self._may_send.set()
+        self._tokens = self.burst
+        self._last_refill = time.monotonic()
+        self._task: asyncio.Task | None = None
+        # Set while a telegram is handed to xknx or knx.send
+        self._transmitting = False
+        self._store: Store | None = (
+            Store(hass, STORAGE_VERSION, store_key) if store_key else None
+        )
+        # Nothing is saved before async_load ran. Store.async_load returns the
+        # data of a pending save instead of reading the file.
+        self._loaded = self._store is None
+        self._save_scheduled = False
+
+    @callback
+    def start(self, config_entry: ConfigEntry) -> None:
+        if self._task is not None:
+            return
+        self._task = config_entry.async_create_background_task(
+            self.hass, self._async_run(), f"{DOMAIN} transport"
+        )
+        self._register_connection_cb()
+
+    @callback
+    def stop(self) -> None:
+        self._unregister_sent_cb()
+        self._unregister_connection_cb()
+        self._may_send.set()
+        if self._task is None:
+            return
+        self._task.cancel()
+        self._task = None
+
+    async def async_load(self) -> None:
+        if self._store is None:
+            return
+        data = await self._store.async_load()
+        self._loaded = True
+        # Values published while loading are saved together with the restored ones
+        self._schedule_save()
+        if not data:
+            return
+        # Values of the current entity states win over stored ones
+        for address, value in data.get("values", {}).items():
+            self._values.setdefault(parse_ga(address), _payload_from_json(value))
+        now = time.monotonic()
+        wall_now = time.time()
+        for address, (value, sent) in data.get("sent", {}).items():
+            self._last_sent.setdefault(
+                parse_ga(address), (_payload_from_json(value), now - (wall_now - sent))
+            )
+        _LOGGER.debug(
+            f"Restored {len(self._values)} values and {len(self._last_sent)} sent payloads"
+        )
+
+    def _schedule_save(self) -> None:
+        # Saving reschedules a pending write, only schedule one at a time so a
+        # busy bus cannot postpone it forever
+        if not self._loaded or self._store is None or self._save_scheduled:
+            return
+        self._save_scheduled = True
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    def _data_to_save(self) -> dict[str, Any]:
+        self._save_scheduled = False
+        now = time.monotonic()
+        wall_now = time.time()
+        return {
+            "values": {
+                ga_to_str(address): _payload_to_json(payload)
+                for address, payload in self._values.items()
+            },
+            "sent": {
+                ga_to_str(address): (_payload_to_json(payload), wall_now - (now - sent))
+                for address, (payload, sent) in self._last_sent.items()
+            },
+        }
+
+    def _register_connection_cb(self) -> None:
+        # Follows the xknx instance of the KNX integration, which is replaced
+        # whenever the integration is reloaded
+        xknx = self._get_xknx()
+        if xknx is None or xknx is self._connection_xknx:
+            return
+        self._unregister_connection_cb()
+        xknx.connection_manager.register_connection_state_changed_cb(
+            self._connection_state_changed
+        )
+        self._connection_xknx = xknx
+        _LOGGER.debug("Watching the connection state of xknx")
+        state = xknx.connection_manager.state
+        if (state == XknxConnectionState.CONNECTED) != self.connected:
+            self._connection_state_changed(state)
+        else:
+            self._set_connected(self.connected)
+
+    def _unregister_connection_cb(self) -> None:
+        xknx = self._connection_xknx
+        if xknx is not None:
+            xknx.connection_manager.unregister_connection_state_changed_cb(
+                self._connection_state_changed
+            )
+        self._connection_xknx = None
+
+    def _set_connected(self, connected: bool) -> None:
+        self.connected = connected
+        if connected:
+            self._may_send.set()
+        else:
+            self._may_send.clear()
+
+    @callback
+    def _connection_state_changed(self, state: XknxConnectionState) -> None:
+        connected = state == XknxConnectionState.CONNECTED
+        if connected == self.connected:
+            return
+        self._set_connected(connected)
+        if not connected:
+            self.disconnects += 1
+            _LOGGER.debug("KNX interface disconnected, holding telegrams")
+            self._requeue_in_flight()
+            return
+        _LOGGER.debug("KNX interface reconnected")
+        for listener in self._reconnect_listeners:
+            listener()
+
+    def _requeue_in_flight(self) -> None:
+        # xknx drops what it could not send before the connection broke. Writes
+        # are sent again after reconnecting unless a newer value is waiting.
+        now = time.monotonic()
+        for telegram, _ in self._in_flight.values():
+            if not isinstance(telegram.payload, GroupValueWrite):
+                continue
+            address = telegram.destination_address.raw
+            if any(address in pending for pending in self._pending):
+                continue
+            self._pending[PRIORITY_STATE][address] = OutboundTelegram(
+                telegram.payload.value, False, PRIORITY_STATE, now
+            )
+            self._has_pending.set()
+        self._in_flight.clear()
+
+    @callback
+    def async_add_reconnect_listener(self, listener: CALLBACK_TYPE) -> CALLBACK_TYPE:
+        self._reconnect_listeners.append(listener)
+
+        @callback
+        def remove_listener() -> None:
+            self._reconnect_listeners.remove(listener)
+
+        return remove_listener
+
+    def _register_sent_cb(self, xknx: XKNX) -> None:
+        if self._sent_cb_xknx is xknx:
+            return
+        # The KNX integration was reloaded, telegrams in flight are lost
+        self._unregister_sent_cb()
+        self._sent_cb = xknx.telegram_queue.register_telegram_received_cb(
+            self._telegram_sent, match_for_outgoing=True
+        )
+        self._sent_cb_xknx = xknx
+
+    def _unregister_sent_cb(self) -> None:
+        if self._sent_cb_xknx is not None:
+            self._sent_cb_xknx.telegram_queue.unregister_telegram_received_cb(
+                self._sent_cb
+            )
+        self._sent_cb_xknx = None
+        self._sent_cb = None
+        self._in_flight.clear()
+
+    @callback
+    def _telegram_sent(self, telegram: Telegram) -> None:
+        # Called by xknx for every telegram, only ours are in flight
+        in_flight = self._in_flight.pop(id(telegram), None)
+        if in_flight is not None:
+            self._send_completed(time.monotonic() - in_flight[1])
+
+    def _send_completed(self, latency: float) -> None:
+        self.sent += 1
+        self.latency += (latency - self.latency) * TRANSPORT_LATENCY_SMOOTHING
+        if latency > CONGESTION_LATENCY:
+            self._back_off(f"latency of {latency:.3f}s")
+        elif self.adaptive:
+            self.current_rate = min(self.rate, self.current_rate + AIMD_INCREASE)
+
+    def _send_failed(self, reason: str) -> None:
+        self.failed += 1
+        self._back_off(reason)
+
+    def _back_off(self, reason: str) -> None:
+        now = time.monotonic()
+        # Only react once per hold time, a congested line delays many telegrams
+        if not self.adaptive or now - self._last_backoff < AIMD_BACKOFF_HOLD:
+            return
+        self._last_backoff = now
+        self.backoffs += 1
+        self.current_rate = max(AIMD_MIN_RATE, self.current_rate * AIMD_DECREASE)
+        _LOGGER.debug(
+            f"Reducing send rate to {self.current_rate:.1f} telegrams/s: {reason}"
+        )
+
+    def _expire_in_flight(self) -> None:
+        now = time.monotonic()
+        for key, (telegram, sent) in list(self._in_flight.items()):
+            if now - sent > CONGESTION_TIMEOUT:
+                del self._in_flight[key]
+                self._send_failed(f"{telegram.destination_address} not sent in time")
+
+    def _is_redundant(self, address: int, payload: DPTBinary | DPTArray) -> bool:
+        last_sent = self._last_sent.get(address)
+        if last_sent is None or last_sent[0] != payload:
+            return False
+        if self.resend_max_age > 0:
+            return time.monotonic() - last_sent[1] < self.resend_max_age
+        return True
+
+    def _pop_pending(self, address: int) -> OutboundTelegram | None:
+        for pending in self._pending:
+            if address in pending:
+                return pending.pop(address)
+        return None
+
+    @callback
+    def async_set_value(
+        self, addresses: Iterable[int], payload: DPTBinary | DPTArray
+    ) -> None:
+        # Makes payload the answer to reads without sending it
+        for address in addresses:
+            self._values[address] = payload
+        self._schedule_save()
+
+    @callback
+    def async_mark_sent(
+        self, addresses: Iterable[int], payload: DPTBinary | DPTArray
+    ) -> None:
+        # Records payload as the value the bus already carries for addresses,
+        # e.g. because KNX wrote it itself. Writes still waiting are older and
+        # dropped, waiting responses answer with payload instead.
+        now = time.monotonic()
+        for address in addresses:
+            self._values[address] = payload
+            self._last_sent[address] = (payload, now)
+            for pending in self._pending:
+                older = pending.get(address)
+                if older is None:
+                    continue
+                self.replaced += 1
+                if older.response:
+                    older.payload = payload
+                else:
+                    del pending[address]
+        self._update_bulk_idle()
+        self._schedule_save()
+
+    @callback
+    def async_answer_read(self, address: int) -> bool:
+        payload = self._values.get(address)
+        if payload is None:
+            return False
+        now = time.monotonic()
+        pending = self._pending[PRIORITY_RESPONSE].get(address)
+        if (pending is not None and pending.response) or (
+            now - self._answered_at.get(address, -math.inf) < self.read_window / 1000
+        ):
+            self.coalesced_reads += 1
+            return True
+        self._answered_at[address] = now
+        self.answered += 1
+        self.async_send((address,), payload, response=True)
+        return True
+
+    @callback
+    def async_send(
+        self,
+        addresses: Iterable[int],
+        payload: DPTBinary | DPTArray,
+        response: bool = False,
+        priority: int | None = None,
+        force: bool = False,
+    ) -> int:
+        # force sends the value even if the bus should already have it. Returns
+        # the number of addresses a telegram was queued for.
+        if priority is None:
+            priority = PRIORITY_RESPONSE if response else PRIORITY_STATE
+
+        self._register_connection_cb()
+        now = time.monotonic()
+        self._schedule_save()
+        queued = 0
+        for address in addresses:
+            self._values[address] = payload
+            telegram = OutboundTelegram(payload, response, priority, now, force)
+            older = self._pop_pending(address)
+            if older is not None:
+                # Keep the urgency, response and force flags of the older
+                # telegram but only ever send the newest value
+                self.replaced += 1
+                telegram.priority = min(priority, older.priority)
+                telegram.response = response or older.response
+                telegram.force = force or older.force
+                telegram.queued = older.queued
+            # Responses are always sent, someone explicitly asked for the value
+            if (
+                not telegram.response
+                and not telegram.force
+                and self._is_redundant(address, payload)
+            ):
+                self.suppressed += 1
+                _LOGGER.debug(f"Skipping unchanged {payload} -> {ga_to_str(address)}")
+                continue
+            self._pending[telegram.priority][address] = telegram
+            self._has_pending.set()
+            queued += 1
+        self._update_bulk_idle()
+        return queued
+
+    @property
+    def idle(self) -> bool:
+        # Nothing waiting and nothing being handed over right now
+        return not self._transmitting and not any(self._pending)
+
+    def _update_bulk_idle(self) -> None:
+        if self._pending[PRIORITY_BULK]:
+            self._bulk_idle.clear()
+        else:
+            self._bulk_idle.set()
+
+    async def async_send_bulk(
+        self, addresses: Sequence[int], progress: Callable[[int], None]
+    ) -> int:
+        # Sends the known values of addresses behind all other telegrams. Only a
+        # chunk is queued at a time, progress is called with the addresses done.
+        # Returns the number of values sent.
+        sent = 0
+        for start in range(0, len(addresses), SYNC_CHUNK_SIZE):
+            chunk = addresses[start : start + SYNC_CHUNK_SIZE]
+            for address in chunk:
+                payload = self._values.get(address)
+                if payload is None:
+                    continue
+                sent += self.async_send(
+                    (address,), payload, priority=PRIORITY_BULK, force=True
+                )
+            await self._bulk_idle.wait()
+            progress(start + len(chunk))
+        return sent
+
+    def _pop_next(self) -> tuple[int, OutboundTelegram] | None:
+        for pending in self._pending:
+            if pending:
+                address = next(iter(pending))
+                return address, pending.pop(address)
+        return None
+
+    async def _async_take_token(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._last_refill) * self.current_rate
+            )
+            self._last_refill = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.current_rate)
+
+    async def _async_wait_connected(self) -> None:
+        while not self._may_send.is_set():
+            # The disconnected instance may have been replaced by a new one
+            # that never reports to us
+            self._register_connection_cb()
+            try:
+                async with asyncio.timeout(CONNECTION_CHECK_INTERVAL):
+                    await self._may_send.wait()
+            except TimeoutError:
+                pass
+
+    async def _async_run(self) -> None:
+        while True:
+            await self._has_pending.wait()
+            await self._async_wait_connected()
+            # Wait for the budget before picking the telegram, so values that
+            # get replaced in the meantime are sent in their newest version
+            await self._async_take_token()
+            job = self._pop_next()
+            self._update_bulk_idle()
+            if job is None:
+                self._has_pending.clear()
+                continue
+            address, telegram = job
+            queue_delay = time.monotonic() - telegram.queued
+            self.queue_delay += (
+                queue_delay - self.queue_delay
+            ) * TRANSPORT_LATENCY_SMOOTHING
+            self.max_queue_delay = max(self.max_queue_delay, queue_delay)
+            self._transmitting = True
+            try:
+                await self._async_transmit(address, telegram)
+            except Exception:
+                _LOGGER.exception(
+                    f"Error while sending {telegram.payload} -> {ga_to_str(address)}"
+                )
+                self._send_failed(f"sending to {ga_to_str(address)} failed")
+            finally:
+                self._transmitting = False
+            self._expire_in_flight()
+
+    async def _async_transmit(self, address: int, telegram: OutboundTelegram) -> None:
+        xknx = self._get_xknx()
+        if xknx is None:
+            # The service call only returns once the telegram was queued
+            started = time.monotonic()
+            await self._async_send_service(address, telegram.payload, telegram.response)
+            self._send_completed(time.monotonic() - started)
+        else:
+            self._register_sent_cb(xknx)
+            await self._async_send_telegram(
+                xknx, address, telegram.payload, telegram.response
+            )
+        self._last_sent[address] = (telegram.payload, time.monotonic())
+        self._schedule_save()
+
+    def _get_xknx(self) -> XKNX | None:
+        knx_module = self.hass.data.get(DOMAIN_KNX)
+        return getattr(knx_module, "xknx", None)
+
+    async def _async_send_telegram(
+        self,
+        xknx: XKNX,
+        address: int,
+        payload: DPTBinary | DPTArray,
+        response: bool,
+    ) -> None:
+        telegram = Telegram(
+            destination_address=GroupAddress(address),
+            payload=(
+                GroupValueResponse(payload) if response else GroupValueWrite(payload)
+            ),
+            source_address=xknx.current_address,
+        )
+        self._in_flight[id(telegram)] = (telegram, time.monotonic())
+        await xknx.telegrams.put(telegram)
+
+    async def _async_send_service(
+        self,
+        address: int,
+        payload: DPTBinary | DPTArray,
+        response: bool,
+    ) -> None:
+        _LOGGER.debug(
+            f"xknx not available, sending {ga_to_str(address)} through knx.send"
+        )
+        await self.hass.services.async_call(
+            DOMAIN_KNX,
+            SERVICE_KNX_SEND,
+            {
+                KNX_ADDRESS: ga_to_str(address),
+                # The service expects an int for DPTBinary and a list for DPTArray
+                SERVICE_KNX_ATTR_PAYLOAD: _payload_to_json(payload),
+                SERVICE_KNX_ATTR_RESPONSE: response,
+            },
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "current_rate": self.current_rate,
+            "adaptive": self.adaptive,
+            "burst": self.burst,
+            "resend_max_age": self.resend_max_age,
+            "sent": self.sent,
+            "failed": self.failed,
+            "in_flight": len(self._in_flight),
+            "backoffs": self.backoffs,
+            "latency": self.latency,
+            "queue_delay": self.queue_delay,
+            "max_queue_delay": self.max_queue_delay,
+            "suppressed": self.suppressed,
+            "replaced": self.replaced,
+            "read_window": self.read_window,
+            "answered": self.answered,
+            "coalesced_reads": self.coalesced_reads,
+            "pending": [len(pending) for pending in self._pending],
+            "cached_addresses": len(self._last_sent),
+            "known_values": len(self._values),
+            "connected": self.connected,
+            "disconnects": self.disconnects,
+        }
+
+
+def _payload_to_json(payload: DPTBinary | DPTArray) -> int | list[int]:
+    if isinstance(payload, DPTBinary):
+        return payload.value
+    return list(payload.value)
+
+
+def _payload_from_json(value: int | list[int]) -> DPTBinary | DPTArray:
+    if isinstance(value, int):
+        return DPTBinary(value)
+    return DPTArray(tuple(value))
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import time
+from collections.abc import Callable, Coroutine
+from typing import Any
+
+from .const import DOMAIN, WORKER_QUEUE_SIZE, WORKER_LATENCY_SMOOTHING
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+
+_LOGGER = logging.getLogger(DOMAIN)
+
+# Called with the destination group address and the telegram payload
+TelegramHandler = Callable[[str, Any], Coroutine[Any, Any, None]]
+
+
+class TelegramWorker:
+    """Processes the telegrams of a single synced entity in order.
+
+    Every synced entity gets its own worker, so a slow service call only delays
+    the telegrams of the entity it belongs to.
+
+    Latency is measured from queuing a job until its handler returned. Service
+    calls block until the target entity executed them, so a slow target shows
+    up in the latency of its worker. Lights queue their merged service call as
+    a job of its own, its latency starts when the merge window closes.
+    """
+
+    hass: HomeAssistant
+    name: str
+    processed: int
+    dropped: int
+    latency: float
+    max_latency: float
+
+    def __init__(self, hass: HomeAssistant, name: str) -> None:
+        self.hass = hass
+        self.name = name
+        self._queue: asyncio.Queue[tuple[float, TelegramHandler, str, Any]] = (
+            asyncio.Queue(WORKER_QUEUE_SIZE)
+        )
+        self._task: asyncio.Task | None = None
+        # Set while a job taken off the queue runs
+        self._handling = False
+        self.processed = 0
+        self.dropped = 0
+        # Seconds from enqueueing a job until its handler and the service call
+        # it made finished, averaged and at most
+        self.latency = 0.0
+        self.max_latency = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def idle(self) -> bool:
+        return not self._handling and self._queue.empty()
+
+    @callback
+    def start(self, config_entry: ConfigEntry) -> None:
+        if self._task is not None:
+            return
+        self._task = config_entry.async_create_background_task(
+            self.hass, self._async_run(), f"{DOMAIN} worker {self.name}"
+        )
+
+    @callback
+    def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        self._task = None
+
+    @callback
+    def put(self, handler: TelegramHandler, address: str, payload: Any) -> bool:
+        # Queues a telegram, it is dropped if the queue is full
+        if self.try_put(handler, address, payload):
+            return True
+        self.dropped += 1
+        _LOGGER.warning(
+            f"Queue of {self.name} is full, dropping telegram from {address}"
+        )
+        return False
+
+    @callback
+    def try_put(self, handler: TelegramHandler, address: str, payload: Any) -> bool:
+        # Queues a job if there is room, callers retrying later handle False
+        try:
+            self._queue.put_nowait((time.monotonic(), handler, address, payload))
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def _async_run(self) -> None:
+        while True:
+            queued, handler, address, payload = await self._queue.get()
+            self._handling = True
+            try:
+                await handler(address, payload)
+            except Exception:
+                _LOGGER.exception(
+                    f"Error while handling telegram from {address} for {self.name}"
+                )
+            finally:
+                self._handling = False
+            latency = time.monotonic() - queued
+            self.processed += 1
+            self.latency += (latency - self.latency) * WORKER_LATENCY_SMOOTHING
+            self.max_latency = max(self.max_latency, latency)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "queue_depth": self.queue_depth,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "latency": self.latency,
+            "max_latency": self.max_latency,
+        }
@@ -0,0 +1,126 @@
+"""
+Measures the cost of dispatching inbound telegrams against the synced entity count
+
+For every entity count a KNXSyncer with that many synced lights runs against
+the stand-in core of stand_in.py. Telegrams go through the event filter and
+async_got_telegram like the knx_event listener would get them, half of them
+to the switch address of a random light and half to addresses nobody routes.
+Only the dispatch itself is timed, the workers handle the telegrams between
+batches. Requires Home Assistant and xknx to be installed.
+
+    python scripts/bench_dispatch.py [--entities 10 100 1000 5000]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from knxsync import KNXSyncer  # noqa: E402
+from knxsync.const import (  # noqa: E402
+    CONF_KNXSYNC_SYNCED_ENTITIES,
+    CONF_KNXSYNC_RATE_LIMIT,
+    TELEGRAMTYPE_WRITE,
+)
+from knxsync.helpers import ga_to_str  # noqa: E402
+from stand_in import StandInConfigEntry, StandInHass  # noqa: E402
+
+from homeassistant.const import CONF_ADDRESS  # noqa: E402
+from homeassistant.core import Event  # noqa: E402
+from homeassistant.components.knx.const import CONF_STATE_ADDRESS  # noqa: E402
+
+# Switch, status and unrouted addresses of the benchmark lights start here
+SWITCH_BASE = 1
+STATE_BASE = 0x4000
+UNROUTED_BASE = 0x8000
+BATCH_SIZE = 100
+
+
+def build_config(entities: int) -> dict[str, Any]:
+    return {
+        CONF_KNXSYNC_RATE_LIMIT: 0,
+        CONF_KNXSYNC_SYNCED_ENTITIES: {
+            f"light.bench_{index}": {
+                CONF_ADDRESS: [ga_to_str(SWITCH_BASE + index)],
+                CONF_STATE_ADDRESS: [ga_to_str(STATE_BASE + index)],
+            }
+            for index in range(entities)
+        },
+    }
+
+
+def build_telegrams(entities: int, telegrams: int) -> list[dict[str, Any]]:
+    rng = random.Random(entities)
+    return [
+        {
+            "destination": ga_to_str(
+                (SWITCH_BASE if index % 2 else UNROUTED_BASE) + rng.randrange(entities)
+            ),
+            "telegramtype": TELEGRAMTYPE_WRITE,
+            "data": index % 2,
+        }
+        for index in range(telegrams)
+    ]
+
+
+async def async_measure(entities: int, telegrams: int) -> tuple[float, float]:
+    # Returns the nanoseconds per routed and per unrouted telegram
+    hass = StandInHass(asyncio.get_running_loop())
+    config_entry = StandInConfigEntry(build_config(entities))
+    syncer = KNXSyncer(hass, config_entry, persist=False)
+    syncer.transport.start(config_entry)
+    for synced_entity in syncer.synced_entities.values():
+        synced_entity.worker.start(config_entry)
+
+    elapsed = {True: 0, False: 0}
+    counts = {True: 0, False: 0}
+    events = build_telegrams(entities, telegrams)
+    for start in range(0, len(events), BATCH_SIZE):
+        for data in events[start : start + BATCH_SIZE]:
+            started = time.perf_counter_ns()
+            routed = syncer._filter_telegram(data)
+            if routed:
+                syncer.async_got_telegram(Event("knx_event", data))
+            elapsed[routed] += time.perf_counter_ns() - started
+            counts[routed] += 1
+        # Let the workers handle the batch, so no queue runs full
+        while any(
+            synced_entity.worker.queue_depth
+            for synced_entity in syncer.synced_entities.values()
+        ):
+            await asyncio.sleep(0)
+
+    syncer.shutdown()
+    config_entry.cancel_tasks()
+    return (
+        elapsed[True] / max(counts[True], 1),
+        elapsed[False] / max(counts[False], 1),
+    )
+
+
+async def async_main(entity_counts: list[int], telegrams: int) -> None:
+    print(f"{'entities':>8} {'routed ns':>10} {'unrouted ns':>12}")
+    for entities in entity_counts:
+        routed, unrouted = await async_measure(entities, telegrams)
+        print(f"{entities:>8} {routed:>10.0f} {unrouted:>12.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--entities", type=int, nargs="+", default=[10, 100, 1000, 5000]
+    )
+    parser.add_argument("--telegrams", type=int, default=20000)
+    args = parser.parse_args()
+    if not all(0 < entities < STATE_BASE for entities in args.entities):
+        parser.error(f"entity counts must be between 1 and {STATE_BASE - 1}")
+    asyncio.run(async_main(args.entities, args.telegrams))
+
+
+if __name__ == "__main__":
+    main()
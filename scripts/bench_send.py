@@ -0,0 +1,126 @@
+"""
+Compares sending state telegrams directly through xknx with the knx.send path
+
+Both runs queue the same telegrams on a KNXTransport without rate limit and
+stop once every telegram reached the xknx telegram queue. The direct run puts
+them there itself, the other one calls knx.send through the service registry
+of a real Home Assistant core, with the schema of the KNX integration and a
+handler building the telegrams like it does. Requires Home Assistant and xknx
+to be installed.
+
+    python scripts/bench_send.py [--telegrams 5000] [--fanout 1] [--runs 5]
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from knxsync.transport import KNXTransport  # noqa: E402
+from stand_in import StandInConfigEntry, StandInKNXModule, StandInXKNX  # noqa: E402
+
+from homeassistant.core import HomeAssistant, ServiceCall  # noqa: E402
+from homeassistant.components.knx.const import (  # noqa: E402
+    DOMAIN as DOMAIN_KNX,
+    KNX_ADDRESS,
+    SERVICE_KNX_ATTR_PAYLOAD,
+    SERVICE_KNX_ATTR_RESPONSE,
+    SERVICE_KNX_SEND,
+)
+from homeassistant.components.knx.services import SERVICE_KNX_SEND_SCHEMA  # noqa: E402
+from xknx.dpt.payload import DPTArray, DPTBinary  # noqa: E402
+from xknx.telegram import GroupAddress, Telegram  # noqa: E402
+from xknx.telegram.apci import GroupValueResponse, GroupValueWrite  # noqa: E402
+
+
+def register_knx_send(hass: HomeAssistant, xknx: StandInXKNX) -> None:
+    async def async_knx_send(call: ServiceCall) -> None:
+        value = call.data[SERVICE_KNX_ATTR_PAYLOAD]
+        payload = DPTBinary(value) if isinstance(value, int) else DPTArray(value)
+        for address in call.data[KNX_ADDRESS]:
+            await xknx.telegrams.put(
+                Telegram(
+                    destination_address=GroupAddress(address),
+                    payload=(
+                        GroupValueResponse(payload)
+                        if call.data[SERVICE_KNX_ATTR_RESPONSE]
+                        else GroupValueWrite(payload)
+                    ),
+                    source_address=xknx.current_address,
+                )
+            )
+
+    hass.services.async_register(
+        DOMAIN_KNX, SERVICE_KNX_SEND, async_knx_send, schema=SERVICE_KNX_SEND_SCHEMA
+    )
+
+
+async def async_run(
+    hass: HomeAssistant, direct: bool, telegrams: int, fanout: int
+) -> float:
+    # Returns the seconds until all telegrams were handed to xknx
+    xknx = StandInXKNX()
+    if direct:
+        hass.data[DOMAIN_KNX] = StandInKNXModule(xknx)
+    else:
+        hass.data.pop(DOMAIN_KNX, None)
+        register_knx_send(hass, xknx)
+    config_entry = StandInConfigEntry({})
+    transport = KNXTransport(hass)
+    transport.start(config_entry)
+    config_entry.async_create_background_task(hass, xknx.async_drain(), "drain")
+
+    # Every send goes to addresses of its own, so nothing is replaced or skipped
+    started = time.perf_counter()
+    for index in range(telegrams // fanout):
+        first = 1 + index * fanout
+        transport.async_send(range(first, first + fanout), DPTArray((index % 256,)))
+    while xknx.sent < telegrams:
+        await asyncio.sleep(0)
+    duration = time.perf_counter() - started
+
+    transport.stop()
+    config_entry.cancel_tasks()
+    return duration
+
+
+async def async_main(telegrams: int, fanout: int, runs: int) -> None:
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        results = {}
+        for direct in (True, False):
+            durations = [
+                await async_run(hass, direct, telegrams, fanout) for _ in range(runs)
+            ]
+            results[direct] = min(durations)
+        await hass.async_stop(force=True)
+
+    for direct, name in ((True, "xknx"), (False, "knx.send")):
+        print(
+            f"{name:>9}: {results[direct] * 1e6 / telegrams:8.1f} µs per telegram, "
+            f"{telegrams / results[direct]:9.0f} telegrams/s"
+        )
+    print(f"  speedup: {results[False] / results[True]:.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--telegrams", type=int, default=5000)
+    parser.add_argument(
+        "--fanout", type=int, default=1, help="state addresses per sent value"
+    )
+    parser.add_argument("--runs", type=int, default=5, help="best of this many runs")
+    args = parser.parse_args()
+    if not 0 < args.fanout <= args.telegrams <= 65535:
+        parser.error("need 0 < fanout <= telegrams <= 65535")
+    if args.telegrams % args.fanout:
+        parser.error("telegrams must be a multiple of fanout")
+    asyncio.run(async_main(args.telegrams, args.fanout, args.runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Replays a trace written by the knxsync.dump_trace action through a KNXSyncer
+
+The syncer runs against the stand-in core of stand_in.py: states come from the
+trace, service calls are only counted and, as no KNX integration is loaded,
+telegrams end up as counted knx.send calls. Requires Home Assistant and xknx
+to be installed.
+
+    python scripts/replay_trace.py trace.jsonl config.json [--realtime]
+
+config.json holds the data of the knxsync config entry, as shown in its
+diagnostics under "config". Replays as fast as possible ignore its rate limit,
+so the throughput is that of knxsync itself. Latencies are per telegram, from
+queuing it on a worker until its handler returned.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from knxsync import KNXSyncer  # noqa: E402
+from knxsync.const import CONF_KNXSYNC_RATE_LIMIT, DEFAULT_RATE_LIMIT  # noqa: E402
+from knxsync.trace import TRACE_STATE, TRACE_TELEGRAM  # noqa: E402
+from knxsync.worker import TelegramHandler, TelegramWorker  # noqa: E402
+from stand_in import StandInConfigEntry, StandInHass  # noqa: E402
+
+from homeassistant.core import Event, State  # noqa: E402
+
+
+def load_trace(path: str) -> list[dict[str, Any]]:
+    with open(path, encoding="utf-8") as trace_file:
+        return [json.loads(line) for line in trace_file if line.strip()]
+
+
+def measure_latencies(worker: TelegramWorker, latencies: list[float]) -> None:
+    # Wraps every queued handler to record its own latency, the worker itself
+    # only keeps an average and the maximum. put queues through try_put.
+    try_put = worker.try_put
+
+    def timed_try_put(handler: TelegramHandler, address: str, payload: Any) -> bool:
+        queued = time.monotonic()
+
+        async def timed_handler(address: str, payload: Any) -> None:
+            try:
+                await handler(address, payload)
+            finally:
+                latencies.append(time.monotonic() - queued)
+
+        return try_put(timed_handler, address, payload)
+
+    worker.try_put = timed_try_put
+
+
+def summarize(latencies: list[float]) -> dict[str, float]:
+    if len(latencies) < 2:
+        return {"max": max(latencies, default=0)}
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "p50": percentiles[49],
+        "p90": percentiles[89],
+        "p99": percentiles[98],
+        "max": max(latencies),
+    }
+
+
+async def async_replay(
+    trace: list[dict[str, Any]], config: dict[str, Any], realtime: bool
+) -> dict[str, Any]:
+    if not realtime:
+        config = config | {CONF_KNXSYNC_RATE_LIMIT: 0}
+    hass = StandInHass(asyncio.get_running_loop())
+    config_entry = StandInConfigEntry(config)
+    # Nothing is saved while replaying
+    syncer = KNXSyncer(hass, config_entry, persist=False)
+    syncer.transport.start(config_entry)
+    latencies: list[float] = []
+    for synced_entity in syncer.synced_entities.values():
+        measure_latencies(synced_entity.worker, latencies)
+        synced_entity.worker.start(config_entry)
+
+    telegrams = 0
+    state_changes = 0
+    first = trace[0]["time"] if trace else 0.0
+    started = time.monotonic()
+    for record in trace:
+        if realtime:
+            delay = record["time"] - first - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        if record["type"] == TRACE_TELEGRAM:
+            telegrams += 1
+            syncer.async_got_telegram(
+                Event(
+                    "knx_event",
+                    {
+                        "destination": record["destination"],
+                        "telegramtype": record["telegramtype"],
+                        "data": record["data"],
+                    },
+                )
+            )
+        elif record["type"] == TRACE_STATE:
+            state_changes += 1
+            entity_id = record["entity_id"]
+            new_state = (
+                State(entity_id, record["state"], record["attributes"])
+                if record["state"] is not None
+                else None
+            )
+            old_state = hass.states.set(entity_id, new_state)
+            await syncer._async_state_changed(
+                Event(
+                    "state_changed",
+                    {
+                        "entity_id": entity_id,
+                        "old_state": old_state,
+                        "new_state": new_state,
+                    },
+                )
+            )
+        # Let the workers and the transport catch up like the event loop would
+        await asyncio.sleep(0)
+
+    # Wait until every entity, including its merge windows, and the transport
+    # are done with the trace
+    while not syncer.transport.idle or not all(
+        synced_entity.idle for synced_entity in syncer.synced_entities.values()
+    ):
+        await asyncio.sleep(0.01)
+    duration = time.monotonic() - started
+
+    syncer.shutdown()
+    config_entry.cancel_tasks()
+
+    return {
+        "records": len(trace),
+        "telegrams": telegrams,
+        "state_changes": state_changes,
+        "rate_limit": config.get(CONF_KNXSYNC_RATE_LIMIT, DEFAULT_RATE_LIMIT),
+        "duration": duration,
+        "throughput": len(trace) / duration if duration else 0,
+        "jobs_processed": len(latencies),
+        "latency": summarize(latencies),
+        "service_calls": dict(hass.services.calls),
+        "service_call_entities": dict(hass.services.entities),
+        "transport": syncer.transport.as_dict(),
+        "batcher": syncer.batcher.as_dict(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("trace", help="trace file written by knxsync.dump_trace")
+    parser.add_argument("config", help="JSON file with the config entry data")
+    parser.add_argument(
+        "--realtime",
+        action="store_true",
+        help="replay at the original speed and rate limit instead of as fast as "
+        "possible",
+    )
+    args = parser.parse_args()
+
+    with open(args.config, encoding="utf-8") as config_file:
+        config = json.load(config_file)
+    report = asyncio.run(async_replay(load_trace(args.trace), config, args.realtime))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+A small stand-in for the Home Assistant core to run knxsync outside of Home
+Assistant, used by the replay and benchmark scripts in this directory
+
+States are set by the script, service calls are only counted. As no KNX
+integration is loaded, telegrams end up as counted knx.send calls unless the
+script puts an xknx instance into hass.data.
+"""
+
+import asyncio
+from collections import Counter
+from collections.abc import Callable
+from typing import Any
+
+from homeassistant.core import HassJob, State
+from xknx.core import XknxConnectionState
+from xknx.telegram import IndividualAddress, Telegram
+
+
+class StandInStates:
+    def __init__(self) -> None:
+        self._states: dict[str, State] = {}
+
+    def get(self, entity_id: str) -> State | None:
+        return self._states.get(entity_id)
+
+    def set(self, entity_id: str, state: State | None) -> State | None:
+        old_state = self._states.get(entity_id)
+        if state is None:
+            self._states.pop(entity_id, None)
+        else:
+            self._states[entity_id] = state
+        return old_state
+
+
+class StandInServices:
+    def __init__(self) -> None:
+        self.calls: Counter[str] = Counter()
+        self.entities: Counter[str] = Counter()
+
+    async def async_call(
+        self, domain: str, service: str, data: dict[str, Any], **_: Any
+    ) -> None:
+        self.calls[f"{domain}.{service}"] += 1
+        entity_ids = data.get("entity_id", [])
+        self.entities[f"{domain}.{service}"] += (
+            len(entity_ids) if isinstance(entity_ids, list) else 1
+        )
+
+
+class StandInBus:
+    def async_fire(self, *_: Any, **__: Any) -> None:
+        pass
+
+
+class StandInHass:
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.data: dict[str, Any] = {}
+        self.states = StandInStates()
+        self.services = StandInServices()
+        self.bus = StandInBus()
+
+    def async_run_hass_job(self, job: HassJob, *args: Any) -> None:
+        # Timers of async_call_later end up here
+        result = job.target(*args)
+        if asyncio.iscoroutine(result):
+            self.loop.create_task(result)
+
+
+class StandInConfigEntry:
+    def __init__(self, data: dict[str, Any]) -> None:
+        self.data = data
+        self.entry_id = "stand_in"
+        self.tasks: list[asyncio.Task] = []
+
+    def async_create_background_task(self, _: Any, coro: Any, name: str) -> Any:
+        task = asyncio.get_running_loop().create_task(coro, name=name)
+        self.tasks.append(task)
+        return task
+
+    def async_create_task(self, hass: Any, coro: Any, name: str = "") -> Any:
+        return self.async_create_background_task(hass, coro, name)
+
+    def cancel_tasks(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+
+
+class StandInTelegramQueue:
+    def __init__(self) -> None:
+        self.callbacks: list[Callable[[Telegram], None]] = []
+
+    def register_telegram_received_cb(
+        self, callback: Callable[[Telegram], None], **_: Any
+    ) -> Callable[[Telegram], None]:
+        self.callbacks.append(callback)
+        return callback
+
+    def unregister_telegram_received_cb(
+        self, callback: Callable[[Telegram], None]
+    ) -> None:
+        self.callbacks.remove(callback)
+
+
+class StandInConnectionManager:
+    state = XknxConnectionState.CONNECTED
+
+    def register_connection_state_changed_cb(self, *_: Any) -> None:
+        pass
+
+    def unregister_connection_state_changed_cb(self, *_: Any) -> None:
+        pass
+
+
+class StandInXKNX:
+    """The parts of xknx knxsync sends telegrams through, always connected.
+
+    Telegrams put into telegrams count as sent as soon as a task running
+    async_drain took them, instead of being sent to a bus.
+    """
+
+    def __init__(self) -> None:
+        self.telegrams: asyncio.Queue[Telegram] = asyncio.Queue()
+        self.current_address = IndividualAddress(0)
+        self.telegram_queue = StandInTelegramQueue()
+        self.connection_manager = StandInConnectionManager()
+        self.sent = 0
+
+    async def async_drain(self) -> None:
+        while True:
+            telegram = await self.telegrams.get()
+            self.sent += 1
+            for callback in self.telegram_queue.callbacks:
+                callback(telegram)
+
+
+class StandInKNXModule:
+    # What the KNX integration keeps in hass.data
+    def __init__(self, xknx: StandInXKNX) -> None:
+        self.xknx = xknx